@@ -0,0 +1,297 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Module for storing precomputed pitch control surfaces for a whole match, and reading them back one frame at a time.
+
+An archive is a directory holding:
+    surfaces.npy: the surfaces of all archived frames, dimen (frames, n_grid_cells_y, n_grid_cells_x), as a .npy file
+                  that is memory-mapped, so a single frame can be read without loading the whole file
+    frames.npy: the tracking frame number of each surface (the frame index)
+    teams.npy: the team in possession ("Home" or "Away") for each surface
+    events.npy: (optional) the event id of each surface, for archives written with write_pitch_control_archive_for_events()
+    metadata.json: the grid (field_dimen, n_grid_cells_x), model parameters (and their ModelParams fingerprint),
+                   offside setting and goalkeeper numbers used to generate the surfaces
+
+Functions
+----------
+
+write_pitch_control_archive(): evaluates pitch control surfaces for a list of tracking frames (e.g. every frame of a match),
+streaming them straight into a new archive
+
+write_pitch_control_archive_for_events(): evaluates the pitch control surface at the moment of each event in a list (as
+in Metrica_PitchControl.generate_pitch_control_for_event) and writes them to a new archive
+
+Classes
+---------
+
+The 'PitchControlArchive' class opens an archive for reading, giving the surface of any archived frame or event.
+
+"""
+
+import json
+import os
+
+import numpy as np
+import Metrica_PitchControl as mpc
+
+
+def write_pitch_control_archive(
+    path,
+    frames,
+    tracking_home,
+    tracking_away,
+    attacking_team,
+    params,
+    GK_numbers,
+    ball_start_positions=None,
+    field_dimen=(106.0, 68.0,),
+    n_grid_cells_x=50,
+    offsides=True,
+    event_ids=None,
+    max_bytes=None,
+):
+    """ write_pitch_control_archive
+
+    Evaluates pitch control surfaces for a list (or range) of tracking frames with
+    Metrica_PitchControl.generate_pitch_control_for_frames(), writing them straight into a new archive (the surfaces are
+    never all held in memory). The surfaces are stored in the floating point type given by params['dtype'].
+
+    Parameters
+    -----------
+        path: directory of the archive (created if it does not exist; an existing archive is overwritten)
+        frames: list, range or array of tracking frame numbers (index of the tracking DataFrames)
+        tracking_home: tracking DataFrame for the Home team
+        tracking_away: tracking DataFrame for the Away team
+        attacking_team: team in possession, "Home" or "Away". Either a single string for all frames or a sequence with one entry per frame
+        params: Dictionary of model parameters (default model parameters can be generated using default_model_params() )
+        GK_numbers: tuple containing the player id of the goalkeepers for the (home team, away team)
+        ball_start_positions: (frames,2) array of ball positions. Default is None, in which case the ball position in the tracking data is used.
+        field_dimen: tuple containing the length and width of the pitch in meters. Default is (106,68)
+        n_grid_cells_x: Number of pixels in the grid (in the x-direction) that covers the surface. Default is 50.
+        offsides: If True, find and remove offside atacking players from the calculation. Default is True.
+        event_ids: Event id of each frame, stored so that surfaces can be looked up by event. Default is None.
+        max_bytes: Approximate memory budget (see Metrica_PitchControl.generate_pitch_control_for_frames). Default is None.
+
+    Returrns
+    -----------
+        archive: PitchControlArchive opened on the new archive
+
+    """
+    frames = np.asarray(frames)
+    if isinstance(attacking_team, str):
+        attacking_team = [attacking_team] * len(frames)
+    xgrid, ygrid, _ = mpc.generate_pitch_grid(field_dimen, n_grid_cells_x)
+    os.makedirs(path, exist_ok=True)
+    # the metadata file is written last, so an archive that was not completed cannot be opened
+    if os.path.exists(os.path.join(path, "metadata.json")):
+        os.remove(os.path.join(path, "metadata.json"))
+    surfaces = np.lib.format.open_memmap(
+        os.path.join(path, "surfaces.npy"),
+        mode="w+",
+        dtype=params.get("dtype", "float64"),
+        shape=(len(frames), len(ygrid), len(xgrid)),
+    )
+    mpc.generate_pitch_control_for_frames(
+        frames,
+        tracking_home,
+        tracking_away,
+        attacking_team,
+        params,
+        GK_numbers,
+        ball_start_positions=ball_start_positions,
+        field_dimen=field_dimen,
+        n_grid_cells_x=n_grid_cells_x,
+        offsides=offsides,
+        max_bytes=max_bytes,
+        out=surfaces,
+    )
+    surfaces.flush()
+    del surfaces
+    np.save(os.path.join(path, "frames.npy"), frames)
+    np.save(os.path.join(path, "teams.npy"), np.asarray(attacking_team, dtype=str))
+    if event_ids is not None:
+        np.save(os.path.join(path, "events.npy"), np.asarray(event_ids))
+    elif os.path.exists(os.path.join(path, "events.npy")):
+        os.remove(os.path.join(path, "events.npy"))
+    metadata = {
+        "field_dimen": [float(d) for d in field_dimen],
+        "n_grid_cells_x": int(n_grid_cells_x),
+        "offsides": bool(offsides),
+        "GK_numbers": [str(gk) for gk in GK_numbers],
+        "params": _json_params(params),
+        "params_fingerprint": mpc.ModelParams(params).fingerprint,
+    }
+    with open(os.path.join(path, "metadata.json"), "w") as f:
+        json.dump(metadata, f, indent=1)
+    return PitchControlArchive(path)
+
+
+def write_pitch_control_archive_for_events(
+    path,
+    event_ids,
+    events,
+    tracking_home,
+    tracking_away,
+    params,
+    GK_numbers,
+    field_dimen=(106.0, 68.0,),
+    n_grid_cells_x=50,
+    offsides=True,
+    max_bytes=None,
+):
+    """ write_pitch_control_archive_for_events
+
+    Evaluates the pitch control surface at the moment of each of the given events (at the start frame of the event,
+    with the ball at its start position, as in Metrica_PitchControl.generate_pitch_control_for_event) and writes them to
+    a new archive.
+
+    Parameters
+    -----------
+        path: directory of the archive (created if it does not exist; an existing archive is overwritten)
+        event_ids: Indices (not rows) of the events, e.g. events.index for every event of the match
+        events: Dataframe containing the event data
+        tracking_home: tracking DataFrame for the Home team
+        tracking_away: tracking DataFrame for the Away team
+        params: Dictionary of model parameters (default model parameters can be generated using default_model_params() )
+        GK_numbers: tuple containing the player id of the goalkeepers for the (home team, away team)
+        field_dimen: tuple containing the length and width of the pitch in meters. Default is (106,68)
+        n_grid_cells_x: Number of pixels in the grid (in the x-direction) that covers the surface. Default is 50.
+        offsides: If True, find and remove offside atacking players from the calculation. Default is True.
+        max_bytes: Approximate memory budget (see Metrica_PitchControl.generate_pitch_control_for_frames). Default is None.
+
+    Returrns
+    -----------
+        archive: PitchControlArchive opened on the new archive
+
+    """
+    event_rows = events.loc[event_ids]
+    return write_pitch_control_archive(
+        path,
+        event_rows["Start Frame"].to_numpy(),
+        tracking_home,
+        tracking_away,
+        list(event_rows.Team),
+        params,
+        GK_numbers,
+        ball_start_positions=event_rows[["Start X", "Start Y"]].to_numpy(dtype=float),
+        field_dimen=field_dimen,
+        n_grid_cells_x=n_grid_cells_x,
+        offsides=offsides,
+        event_ids=event_rows.index.to_numpy(),
+        max_bytes=max_bytes,
+    )
+
+
+class PitchControlArchive(object):
+    """
+    PitchControlArchive(path)
+
+    Opens a pitch control archive (see write_pitch_control_archive) for reading. The surfaces are memory-mapped, so
+    each lookup only reads the requested surface from disk.
+
+    Attributes
+    -----------
+    surfaces: memory-mapped array of all surfaces, dimen (frames, n_grid_cells_y, n_grid_cells_x)
+    frames: tracking frame number of each surface
+    teams: team in possession for each surface
+    event_ids: event id of each surface (None if the archive was not written for events)
+    xgrid, ygrid: positions of the pixels in the x- and y-directions
+    field_dimen, n_grid_cells_x, offsides, GK_numbers, params: settings used to generate the surfaces
+    params_fingerprint: Metrica_PitchControl.ModelParams fingerprint of the parameters (None for older archives)
+
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, "metadata.json")) as f:
+            metadata = json.load(f)
+        self.field_dimen = tuple(metadata["field_dimen"])
+        self.n_grid_cells_x = metadata["n_grid_cells_x"]
+        self.offsides = metadata["offsides"]
+        self.GK_numbers = tuple(metadata["GK_numbers"])
+        self.params = metadata["params"]
+        self.params_fingerprint = metadata.get("params_fingerprint")
+        self.xgrid, self.ygrid, _ = mpc.generate_pitch_grid(
+            self.field_dimen, self.n_grid_cells_x
+        )
+        self.surfaces = np.load(os.path.join(path, "surfaces.npy"), mmap_mode="r")
+        self.frames = np.load(os.path.join(path, "frames.npy"))
+        self.teams = np.load(os.path.join(path, "teams.npy"))
+        # look-up tables from frame (and event id) to the row of the surface
+        self._frame_rows = dict(zip(self.frames.tolist(), range(len(self.frames))))
+        if os.path.exists(os.path.join(path, "events.npy")):
+            self.event_ids = np.load(os.path.join(path, "events.npy"))
+            self._event_rows = dict(
+                zip(self.event_ids.tolist(), range(len(self.event_ids)))
+            )
+        else:
+            self.event_ids = None
+            self._event_rows = None
+
+    def __len__(self):
+        return len(self.frames)
+
+    def __contains__(self, frame):
+        return frame in self._frame_rows
+
+    def get_frame_surface(self, frame):
+        """
+        get_frame_surface(frame)
+
+        Returns the archived surface at a tracking frame, as (PPCFa, xgrid, ygrid), or None if the frame is not archived.
+        PPCFa is a read-only view of the memory-mapped file.
+
+        """
+        row = self._frame_rows.get(frame)
+        if row is None:
+            return None
+        return self.surfaces[row], self.xgrid, self.ygrid
+
+    def get_event_surface(self, event_id, events=None):
+        """
+        get_event_surface(event_id, events=None)
+
+        Returns the archived surface at the moment of an event, as (PPCFa, xgrid, ygrid), or None if the event is not
+        archived. Only archives written for events (with write_pitch_control_archive_for_events) hold event surfaces:
+        the surfaces of a frame archive use the ball position of the tracking data rather than the start position of
+        the event, so they are never returned here. If the event data are given, the archived surface is also checked
+        to be at the start frame of the event, with the same team in possession.
+
+        """
+        if self._event_rows is None:
+            return None
+        row = self._event_rows.get(event_id)
+        if row is None:
+            return None
+        if events is not None and (
+            self.frames[row] != events.loc[event_id]["Start Frame"]
+            or self.teams[row] != events.loc[event_id].Team
+        ):
+            return None
+        return self.surfaces[row], self.xgrid, self.ygrid
+
+    def matches(self, params, field_dimen, n_grid_cells_x, offsides=True):
+        """
+        matches(params, field_dimen, n_grid_cells_x, offsides=True)
+
+        Returns True if the archive was generated with the given model parameters, grid and offside setting (the
+        floating point type, params['dtype'], is not compared).
+
+        """
+        archived = {k: v for k, v in self.params.items() if k != "dtype"}
+        requested = {k: v for k, v in _json_params(params).items() if k != "dtype"}
+        return (
+            archived == requested
+            and tuple(float(d) for d in field_dimen) == self.field_dimen
+            and n_grid_cells_x == self.n_grid_cells_x
+            and offsides == self.offsides
+        )
+
+
+def _json_params(params):
+    # model parameters as plain python values (so they can be stored in, and compared with, the JSON metadata). The
+    # floating point type is stored by name, however it was given (e.g. np.float32 -> "float32")
+    values = {k: v.item() if isinstance(v, np.generic) else v for k, v in params.items()}
+    if "dtype" in values:
+        values["dtype"] = np.dtype(values["dtype"]).name
+    return json.loads(json.dumps(values))
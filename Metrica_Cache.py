@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Module for caching pitch control surfaces, so that the same surface is not evaluated again and again (e.g. the
+baseline surface of an event, which is needed by several analyses).
+
+Results are stored under a key that is a fingerprint of everything the surface depends on: the frame, the team in
+possession, the state of the players (positions, velocities, ...), the model parameters, the grid and the offside
+setting. Keys are built with make_key(), which hashes numpy arrays, tracking rows, dictionaries, TeamState objects
+and plain python values.
+
+The cache has two tiers: an in-memory LRU (least recently used) store, which evicts the oldest entries once the total
+size of the stored arrays exceeds 'max_bytes', and an optional on-disk store (one pickle file per entry in
+'cache_dir'), which keeps results between sessions. Entries found on disk are moved back into memory.
+
+A cache can be shared by several threads: the in-memory store is only changed while holding a lock, and entries are
+written to disk under a temporary name that is unique to the writing thread and process.
+
+Classes
+---------
+
+The 'PitchControlCache' class holds the cached results. Pass an instance as the 'cache' argument of
+Metrica_PitchControl.generate_pitch_control_for_event(), Metrica_EPV.find_max_value_added_target() or
+PlayerEventAnalysis to share results between them.
+
+"""
+
+import hashlib
+import os
+import pickle
+import threading
+from collections import OrderedDict
+from collections.abc import Mapping
+
+import numpy as np
+import pandas as pd
+
+
+class PitchControlCache(object):
+    """
+    PitchControlCache(max_bytes=256*2**20, cache_dir=None)
+
+    In-memory LRU cache of pitch control results, with an optional on-disk tier.
+
+    Parameters
+    -----------
+    max_bytes: Maximum total size (in bytes) of the arrays held in memory. The least recently used entries are evicted
+               once it is exceeded. Default is 256MB.
+    cache_dir: Directory for the on-disk tier. Default is None (memory only).
+
+    Attributes
+    -----------
+    nbytes: Total size of the arrays currently held in memory
+    hits: Number of lookups answered from memory or disk
+    misses: Number of lookups that found nothing
+
+    """
+
+    def __init__(self, max_bytes=256 * 2 ** 20, cache_dir=None):
+        self.max_bytes = max_bytes
+        self.cache_dir = cache_dir
+        if cache_dir is not None:
+            os.makedirs(cache_dir, exist_ok=True)
+        self._entries = OrderedDict()
+        self._lock = threading.RLock()
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        with self._lock:
+            if key in self._entries:
+                return True
+        return self.cache_dir is not None and os.path.exists(self._path(key))
+
+    def __getstate__(self):
+        # the lock cannot be pickled, so a fresh one is made when unpickling
+        state = dict(self.__dict__)
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.RLock()
+
+    def make_key(self, *parts):
+        """ Key for a cached result: a fingerprint of all the inputs that the result depends on """
+        return make_key(*parts)
+
+    def get(self, key, default=None):
+        """ Returns (a copy of) the result stored under key, or default if there is none """
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return _copy(self._entries[key][0])
+        if self.cache_dir is not None and os.path.exists(self._path(key)):
+            with open(self._path(key), "rb") as f:
+                value = pickle.load(f)
+            with self._lock:
+                self._store(key, value)
+                self.hits += 1
+            return _copy(value)
+        with self._lock:
+            self.misses += 1
+        return default
+
+    def put(self, key, value):
+        """ Stores value (an array, or tuple/list/dictionary of arrays) under key, in memory and on disk """
+        value = _copy(value)
+        with self._lock:
+            self._store(key, value)
+        if self.cache_dir is not None:
+            # write to a temporary file first, so that a partly written entry is never read
+            path = self._path(key)
+            tmp = "%s.%d.%d.tmp" % (path, os.getpid(), threading.get_ident())
+            with open(tmp, "wb") as f:
+                pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, path)
+
+    def clear(self):
+        """ Empties the in-memory tier (the on-disk tier is kept) """
+        with self._lock:
+            self._entries.clear()
+            self.nbytes = 0
+
+    def _store(self, key, value):
+        # (called with the lock held) add an entry to the in-memory tier, evicting the least recently used entries to stay within max_bytes
+        if key in self._entries:
+            self.nbytes -= self._entries.pop(key)[1]
+        size = _nbytes(value)
+        if size > self.max_bytes:
+            return
+        self._entries[key] = (value, size)
+        self.nbytes += size
+        while self.nbytes > self.max_bytes:
+            _, (_, evicted_size) = self._entries.popitem(last=False)
+            self.nbytes -= evicted_size
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key + ".pkl")
+
+
+def make_key(*parts):
+    """
+    make_key(*parts)
+
+    Returns a fingerprint (hex string) of the given inputs. Each part can be a numpy array or scalar, a pandas Series
+    or DataFrame (e.g. a tracking row), a dictionary or other mapping (e.g. the model parameters, as a dictionary or
+    ModelParams), a list or tuple, an object such as a TeamState (its attributes are hashed) or any other value with a
+    stable repr().
+
+    """
+    h = hashlib.sha1()
+    for part in parts:
+        _update(h, part)
+    return h.hexdigest()
+
+
+def _update(h, obj):
+    # add obj to the hash h, tagging each value with its type so that e.g. 1 and "1" give different keys
+    if isinstance(obj, np.ndarray):
+        if obj.dtype == object:
+            _update(h, ("ndarray", obj.shape, obj.tolist()))
+        else:
+            h.update(repr(("ndarray", obj.dtype.str, obj.shape)).encode())
+            h.update(np.ascontiguousarray(obj).tobytes())
+    elif isinstance(obj, (pd.Series, pd.DataFrame)):
+        _update(h, (type(obj).__name__, obj.index.to_numpy(), obj.to_numpy()))
+        if isinstance(obj, pd.DataFrame):
+            _update(h, obj.columns.to_numpy())
+    elif isinstance(obj, Mapping):
+        # dictionaries and ModelParams with the same parameters give the same key
+        h.update(b"dict(")
+        for k in sorted(obj, key=repr):
+            _update(h, k)
+            _update(h, obj[k])
+        h.update(b")")
+    elif isinstance(obj, (list, tuple)):
+        h.update(("%s(" % type(obj).__name__).encode())
+        for item in obj:
+            _update(h, item)
+        h.update(b")")
+    elif isinstance(obj, np.generic):
+        _update(h, obj.item())
+    elif hasattr(obj, "__dict__"):
+        _update(h, (type(obj).__name__, vars(obj)))
+    else:
+        h.update(repr((type(obj).__name__, obj)).encode())
+
+
+def _nbytes(value):
+    # total size of the arrays in a (possibly nested) result
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, dict):
+        return sum(_nbytes(v) for v in value.values())
+    if isinstance(value, (list, tuple)):
+        return sum(_nbytes(v) for v in value)
+    return 0
+
+
+def _copy(value):
+    # copy the arrays in a (possibly nested) result, so that callers cannot change the cached arrays
+    if isinstance(value, np.ndarray):
+        return value.copy()
+    if isinstance(value, dict):
+        return {k: _copy(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return type(value)(_copy(v) for v in value)
+    return value
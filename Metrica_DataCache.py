@@ -0,0 +1,313 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Module for caching preprocessed Metrica match data, so that the preprocessing pipeline (reading the event and tracking
+data, converting to metric coordinates, flipping the second half to a single playing direction and calculating the
+player velocities) only runs once per match.
+
+The preprocessed home, away and event tables are stored in a binary columnar format: Parquet files if pyarrow (or
+fastparquet) is installed, otherwise a directory for each table holding one numpy .npy file per column (and one for
+the index) with their names and types in a json file. Both keep the column types (e.g. float32 positions) and the
+index exactly, and neither is read with pickle.
+
+Each entry is stored in a directory named after a key that is a fingerprint of the source files (their paths, sizes
+and modification times) and the preprocessing settings. If a source file is changed, or a different setting is
+asked for, the key changes and the data are preprocessed again, so stale entries are never read. Only one entry is
+kept for each match (of each data directory): writing a new entry removes the others, so the cache does not grow
+every time a file or setting changes.
+
+By default the cache is kept in the user's cache directory ($XDG_CACHE_HOME, or ~/.cache, under
+'metrica_preprocessed'), not in the data directory.
+
+Functions
+----------
+
+load_match_data(): returns the preprocessed tracking data for the home and away teams and the event data of a match,
+from the cache if possible (preprocessing and storing them otherwise)
+
+preprocess_match_data(): runs the preprocessing pipeline on a match without using the cache
+
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import uuid
+
+import numpy as np
+import pandas as pd
+import Metrica_IO as mio
+import Metrica_Velocities as mvel
+
+try:
+    import pyarrow  # noqa: F401
+
+    _PARQUET = True
+except ImportError:
+    try:
+        import fastparquet  # noqa: F401
+
+        _PARQUET = True
+    except ImportError:
+        _PARQUET = False
+
+# bump this when the preprocessing pipeline changes, so that entries written by older versions are not used
+_CACHE_VERSION = 2
+
+_TABLES = ("tracking_home", "tracking_away", "events")
+
+
+def load_match_data(
+    DATADIR,
+    game_id,
+    cache_dir=None,
+    field_dimen=(106.0, 68.0),
+    single_playing_direction=True,
+    velocities=True,
+    smoothing=True,
+    filter_="Savitzky-Golay",
+    window=7,
+    polyorder=1,
+    maxspeed=12,
+    dtype="float32",
+    engine=None,
+):
+    """ load_match_data
+
+    Returns the preprocessed tracking and event data of a match, as produced by preprocess_match_data(). They are
+    read from the cache if it holds an entry for the same source files and settings; otherwise the match is
+    preprocessed and stored in the cache.
+
+    Parameters
+    -----------
+        DATADIR: directory of the Metrica sample data
+        game_id: id of the match (e.g. 2 for Sample_Game_2)
+        cache_dir: directory of the cache. Default is None, in which case 'metrica_preprocessed' in the user's cache directory ($XDG_CACHE_HOME, or ~/.cache) is used.
+        field_dimen: tuple containing the length and width of the pitch in meters. Default is (106,68)
+        single_playing_direction: If True, flip the second half so that each team attacks in the same direction all match. Default is True.
+        velocities: If True, calculate the player velocities (see Metrica_Velocities.calc_player_velocities). Default is True.
+        smoothing, filter_, window, polyorder, maxspeed: settings of Metrica_Velocities.calc_player_velocities
+        dtype: floating point type of the tracking positions (see Metrica_IO.read_tracking_data). Default is "float32".
+        engine: pandas CSV parsing engine used when the data are not cached (see Metrica_IO.read_tracking_data). Default is None.
+
+    Returrns
+    -----------
+        tracking_home: preprocessed tracking DataFrame for the Home team
+        tracking_away: preprocessed tracking DataFrame for the Away team
+        events: preprocessed event DataFrame
+
+    """
+    settings = {
+        "field_dimen": [float(d) for d in field_dimen],
+        "single_playing_direction": bool(single_playing_direction),
+        "velocities": bool(velocities),
+        "smoothing": bool(smoothing),
+        "filter_": filter_,
+        "window": int(window),
+        "polyorder": int(polyorder),
+        "maxspeed": float(maxspeed),
+        "dtype": str(dtype),
+    }
+    if cache_dir is None:
+        cache_dir = os.path.join(
+            os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache"),
+            "metrica_preprocessed",
+        )
+    sources = _source_fingerprints(DATADIR, game_id)
+    key = hashlib.sha1(
+        json.dumps(
+            {"version": _CACHE_VERSION, "sources": sources, "settings": settings},
+            sort_keys=True,
+        ).encode()
+    ).hexdigest()
+    # entries of the same match (from the same data directory) share a prefix, so older ones can be found and removed
+    prefix = "Sample_Game_%d_%s_" % (
+        game_id,
+        hashlib.sha1(os.path.abspath(DATADIR).encode()).hexdigest()[:12],
+    )
+    path = os.path.join(cache_dir, prefix + key)
+    if os.path.exists(os.path.join(path, "metadata.json")):
+        return tuple(_read_table(path, name) for name in _TABLES)
+    tables = preprocess_match_data(
+        DATADIR,
+        game_id,
+        field_dimen=field_dimen,
+        single_playing_direction=single_playing_direction,
+        velocities=velocities,
+        smoothing=smoothing,
+        filter_=filter_,
+        window=window,
+        polyorder=polyorder,
+        maxspeed=maxspeed,
+        dtype=dtype,
+        engine=engine,
+    )
+    # write to a temporary directory first and rename it, so that a partly written entry is never read
+    tmp = os.path.join(cache_dir, "tmp_%s" % uuid.uuid4().hex)
+    os.makedirs(tmp)
+    try:
+        for name, table in zip(_TABLES, tables):
+            _write_table(tmp, name, table)
+        with open(os.path.join(tmp, "metadata.json"), "w") as f:
+            json.dump(
+                {
+                    "version": _CACHE_VERSION,
+                    "game_id": game_id,
+                    "sources": sources,
+                    "settings": settings,
+                },
+                f,
+                indent=1,
+            )
+        os.rename(tmp, path)
+    except OSError:
+        # another process stored the same entry first
+        if not os.path.exists(os.path.join(path, "metadata.json")):
+            raise
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+    # remove the older entries of this match (for other versions of the source files or other settings)
+    for name in os.listdir(cache_dir):
+        if name.startswith(prefix) and os.path.join(cache_dir, name) != path:
+            shutil.rmtree(os.path.join(cache_dir, name), ignore_errors=True)
+    return tables
+
+
+def preprocess_match_data(
+    DATADIR,
+    game_id,
+    field_dimen=(106.0, 68.0),
+    single_playing_direction=True,
+    velocities=True,
+    smoothing=True,
+    filter_="Savitzky-Golay",
+    window=7,
+    polyorder=1,
+    maxspeed=12,
+    dtype="float32",
+    engine=None,
+):
+    """ preprocess_match_data
+
+    Reads the event and tracking data of a match and preprocesses them: positions are converted to meters, the second
+    half is flipped so that each team attacks in the same direction all match, and the player velocities are
+    calculated. See load_match_data() for the parameters.
+
+    """
+    events = mio.read_event_data(DATADIR, game_id)
+    tracking_home = mio.read_tracking_data(
+        DATADIR, game_id, "Home", dtype=dtype, engine=engine
+    )
+    tracking_away = mio.read_tracking_data(
+        DATADIR, game_id, "Away", dtype=dtype, engine=engine
+    )
+    # Convert positions from metrica units to meters (and flip the second half) in one pass
+    tracking_home, tracking_away, events = mio.normalise_coordinates(
+        tracking_home,
+        tracking_away,
+        events,
+        field_dimen=field_dimen,
+        single_playing_direction=single_playing_direction,
+    )
+    if velocities:
+        velocity_settings = dict(
+            smoothing=smoothing,
+            filter_=filter_,
+            window=window,
+            polyorder=polyorder,
+            maxspeed=maxspeed,
+        )
+        tracking_home = mvel.calc_player_velocities(tracking_home, **velocity_settings)
+        tracking_away = mvel.calc_player_velocities(tracking_away, **velocity_settings)
+    return tracking_home, tracking_away, events
+
+
+def _source_fingerprints(DATADIR, game_id):
+    # path, size and modification time of each source file of the match (any change to a file changes these)
+    files = [
+        "Sample_Game_%d/Sample_Game_%d_RawEventsData.csv" % (game_id, game_id),
+        "Sample_Game_%d/Sample_Game_%d_RawTrackingData_Home_Team.csv"
+        % (game_id, game_id),
+        "Sample_Game_%d/Sample_Game_%d_RawTrackingData_Away_Team.csv"
+        % (game_id, game_id),
+    ]
+    fingerprints = []
+    for name in files:
+        stat = os.stat(os.path.join(DATADIR, name))
+        fingerprints.append([name, stat.st_size, stat.st_mtime_ns])
+    return fingerprints
+
+
+def _write_table(path, name, table):
+    if _PARQUET:
+        table.to_parquet(os.path.join(path, name + ".parquet"))
+        return
+    # one .npy file per column, named by position (column names can hold any character), plus one for the index
+    folder = os.path.join(path, name)
+    os.makedirs(folder)
+    columns = []
+    for i, (column, values) in enumerate(table.items()):
+        _save_values(folder, str(i), values)
+        columns.append({"name": column, "dtype": str(values.dtype)})
+    index = table.index
+    if isinstance(index, pd.RangeIndex):
+        index_metadata = {
+            "name": index.name,
+            "range": [index.start, index.stop, index.step],
+        }
+    else:
+        _save_values(folder, "index", index)
+        index_metadata = {"name": index.name, "dtype": str(index.dtype)}
+    with open(os.path.join(folder, "columns.json"), "w") as f:
+        json.dump({"columns": columns, "index": index_metadata}, f, indent=1)
+
+
+def _read_table(path, name):
+    # entries can be read back whichever format they were written in
+    if os.path.exists(os.path.join(path, name + ".parquet")):
+        return pd.read_parquet(os.path.join(path, name + ".parquet"))
+    folder = os.path.join(path, name)
+    with open(os.path.join(folder, "columns.json")) as f:
+        metadata = json.load(f)
+    index_metadata = metadata["index"]
+    if "range" in index_metadata:
+        index = pd.RangeIndex(*index_metadata["range"], name=index_metadata["name"])
+    else:
+        index = pd.Index(
+            _load_values(folder, "index", index_metadata["dtype"]),
+            name=index_metadata["name"],
+        )
+    return pd.DataFrame(
+        {
+            column["name"]: _load_values(folder, str(i), column["dtype"])
+            for i, column in enumerate(metadata["columns"])
+        },
+        index=index,
+    )
+
+
+def _save_values(folder, name, values):
+    # numeric columns are saved as they are. Text columns (e.g. the event types) are saved as fixed width unicode
+    # strings, with a mask of their missing values
+    if isinstance(values.dtype, np.dtype) and values.dtype.kind != "O":
+        np.save(os.path.join(folder, name + ".npy"), values.to_numpy())
+        return
+    assert pd.api.types.infer_dtype(values, skipna=True) in (
+        "string",
+        "empty",
+    ), "Only numeric and text columns can be stored without a Parquet engine"
+    missing = np.asarray(pd.isna(values))
+    text = np.where(missing, "", np.asarray(values, dtype=object)).astype(str)
+    np.save(os.path.join(folder, name + ".npy"), text)
+    np.save(os.path.join(folder, name + "_missing.npy"), missing)
+
+
+def _load_values(folder, name, dtype):
+    values = np.load(os.path.join(folder, name + ".npy"), allow_pickle=False)
+    if os.path.exists(os.path.join(folder, name + "_missing.npy")):
+        values = values.astype(object)
+        values[
+            np.load(os.path.join(folder, name + "_missing.npy"), allow_pickle=False)
+        ] = np.nan
+    return pd.array(values, dtype=dtype)
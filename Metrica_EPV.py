@@ -78,11 +78,8 @@ def get_EPV_at_location(position, EPV, attack_direction, field_dimen=(106.0, 68.
         if attack_direction == -1:
             EPV = np.fliplr(EPV)
         ny, nx = EPV.shape
-        dx = field_dimen[0] / float(nx)
-        dy = field_dimen[1] / float(ny)
-        ix = (x + field_dimen[0] / 2.0 - 0.0001) / dx
-        iy = (y + field_dimen[1] / 2.0 - 0.0001) / dy
-        return EPV[int(iy), int(ix)]
+        iy, ix = mpc.get_pitch_grid(field_dimen, nx, ny).cell_index((x, y))
+        return EPV[iy, ix]
 
 
 def calculate_epv_added(
@@ -122,31 +119,31 @@ def calculate_epv_added(
     home_attack_direction = mio.find_playing_direction(tracking_home, "Home")
     if pass_team == "Home":
         attack_direction = home_attack_direction
-        attacking_players = mpc.initialise_players(
+        attacking_players = mpc.initialise_team_state(
             tracking_home.loc[pass_frame], "Home", params, GK_numbers[0]
         )
-        defending_players = mpc.initialise_players(
+        defending_players = mpc.initialise_team_state(
             tracking_away.loc[pass_frame], "Away", params, GK_numbers[1]
         )
     elif pass_team == "Away":
         attack_direction = home_attack_direction * -1
-        defending_players = mpc.initialise_players(
+        defending_players = mpc.initialise_team_state(
             tracking_home.loc[pass_frame], "Home", params, GK_numbers[0]
         )
-        attacking_players = mpc.initialise_players(
+        attacking_players = mpc.initialise_team_state(
             tracking_away.loc[pass_frame], "Away", params, GK_numbers[1]
         )
     # flag any players that are offside
     attacking_players = mpc.check_offsides(
         attacking_players, defending_players, pass_start_pos, GK_numbers
     )
-    # pitch control grid at pass start location
-    Patt_start, _ = mpc.calculate_pitch_control_at_target(
-        pass_start_pos, attacking_players, defending_players, pass_start_pos, params
-    )
-    # pitch control grid at pass end location
-    Patt_target, _ = mpc.calculate_pitch_control_at_target(
-        pass_target_pos, attacking_players, defending_players, pass_start_pos, params
+    # pitch control at pass start and end locations, in one call
+    (Patt_start, Patt_target), _ = mpc.calculate_pitch_control_at_targets(
+        np.vstack((pass_start_pos, pass_target_pos)),
+        attacking_players,
+        defending_players,
+        pass_start_pos,
+        params,
     )
 
     # EPV at start location
@@ -172,7 +169,7 @@ def calculate_epv_added(
 
 
 def find_max_value_added_target(
-    event_id, events, tracking_home, tracking_away, GK_numbers, EPV, params
+    event_id, events, tracking_home, tracking_away, GK_numbers, EPV, params, cache=None
 ):
     """ find_max_value_added_target
     
@@ -187,6 +184,7 @@ def find_max_value_added_target(
         GK_numbers: tuple containing the player id of the goalkeepers for the (home team, away team)
         EPV: tuple Expected Possession value grid (loaded using load_EPV_grid() )
         params: Dictionary of pitch control model parameters (default model parameters can be generated using default_model_params() )
+        cache: Metrica_Cache.PitchControlCache to look up the pitch control surface of the event in. Default is None (no caching).
         
     Returrns
     -----------
@@ -246,6 +244,7 @@ def find_max_value_added_target(
         field_dimen=(106.0, 68.0,),
         n_grid_cells_x=50,
         offsides=True,
+        cache=cache,
     )
 
     # EPV surface at instance of the pass
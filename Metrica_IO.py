@@ -53,15 +53,120 @@ def tracking_data(DATADIR, game_id, teamname):
         teamname,
     )
     # First:  deal with file headers so that we can get the player names correct
-    csvfile = open("{}/{}".format(DATADIR, teamfile), "r")  # create a csv file reader
-    reader = csv.reader(csvfile)
-    teamnamefull = next(reader)[3].lower()
+    with open("{}/{}".format(DATADIR, teamfile), "r") as csvfile:
+        reader = csv.reader(csvfile)  # create a csv file reader
+        columns = _tracking_columns([next(reader) for _ in range(3)], teamname)
+    # Second: read in tracking data and place into pandas Dataframe
+    tracking = pd.read_csv(
+        "{}/{}".format(DATADIR, teamfile), names=columns, index_col="Frame", skiprows=3
+    )
+    return tracking
+
+
+def read_tracking_data(DATADIR, game_id, teamname, dtype="float32", engine=None):
+    """
+    read_tracking_data(DATADIR,game_id,teamname,dtype="float32",engine=None):
+    read Metrica tracking data for game_id and return as a DataFrame, with the same columns and index as
+    tracking_data(), in a single pass over the file. The three header rows are read from the open file, and the body
+    is then parsed from the same file handle with explicit column types (no type inference): 'Period' is int8, the
+    frame index is int64, 'Time [s]' is float64 (so the timesteps used for velocities are exact) and the player and
+    ball positions are 'dtype' (float32 by default, half the memory of float64).
+    engine is the pandas CSV parsing engine, e.g. "pyarrow" for a faster multi-threaded parse if pyarrow is installed.
+    Default is None (the pandas default, "c").
+    """
+    teamfile = "/Sample_Game_%d/Sample_Game_%d_RawTrackingData_%s_Team.csv" % (
+        game_id,
+        game_id,
+        teamname,
+    )
+    # the file is opened in binary mode, which every parsing engine can read from
+    with open("{}/{}".format(DATADIR, teamfile), "rb") as f:
+        header = [f.readline().decode("utf-8-sig") for _ in range(3)]
+        columns = _tracking_columns(list(csv.reader(header)), teamname)
+        tracking = pd.read_csv(
+            f,
+            names=columns,
+            header=None,
+            index_col="Frame",
+            dtype=_tracking_dtypes(columns, dtype),
+            engine=engine,
+        )
+    return tracking
+
+
+def iter_tracking_data(
+    DATADIR,
+    game_id,
+    teamname,
+    window_size=1500,
+    overlap=25,
+    dtype="float32",
+    engine=None,
+):
+    """
+    iter_tracking_data(DATADIR,game_id,teamname,window_size=1500,overlap=25,dtype="float32",engine=None):
+    read Metrica tracking data for game_id one window of frames at a time, so that only a few windows are ever held in
+    memory however long the match (or feed) is. Yields (window, core) pairs:
+        window: DataFrame of up to window_size+2*overlap consecutive frames, with the same columns, index and types as
+                read_tracking_data(): the 'core' frames of the window plus up to 'overlap' frames of context before
+                and after them (less at the start and end of the file)
+        core: (first_frame, last_frame) of the core frames. The core frames of successive windows follow on from each
+              other without overlapping, so results computed over each window (e.g. smoothed velocities, or pitch
+              control) are free of edge effects once trimmed with window.loc[first_frame:last_frame]
+    engine is the pandas CSV parsing engine, "c" or "python" (parsing in chunks is not supported by "pyarrow").
+    Default is None (the pandas default, "c").
+    """
+    assert 0 <= overlap <= window_size, "overlap must be between 0 and window_size"
+    teamfile = "/Sample_Game_%d/Sample_Game_%d_RawTrackingData_%s_Team.csv" % (
+        game_id,
+        game_id,
+        teamname,
+    )
+    with open("{}/{}".format(DATADIR, teamfile), "rb") as f:
+        header = [f.readline().decode("utf-8-sig") for _ in range(3)]
+        columns = _tracking_columns(list(csv.reader(header)), teamname)
+        reader = pd.read_csv(
+            f,
+            names=columns,
+            header=None,
+            index_col="Frame",
+            dtype=_tracking_dtypes(columns, dtype),
+            engine=engine,
+            chunksize=window_size,
+        )
+        # each chunk is the core of a window. The next chunk is read ahead for the context after it, and the end of
+        # the previous chunk is kept for the context before it
+        before = None
+        chunk = next(reader, None)
+        while chunk is not None:
+            next_chunk = next(reader, None)
+            parts = [chunk]
+            if before is not None:
+                parts.insert(0, before)
+            if next_chunk is not None and overlap > 0:
+                parts.append(next_chunk.iloc[:overlap])
+            window = pd.concat(parts) if len(parts) > 1 else chunk
+            yield window, (chunk.index[0], chunk.index[-1])
+            before = chunk.iloc[len(chunk) - overlap :] if overlap > 0 else None
+            chunk = next_chunk
+
+
+def _tracking_dtypes(columns, dtype):
+    # explicit column types of a tracking file: int frame & period, float64 time and 'dtype' positions
+    dtypes = {c: dtype for c in columns[3:]}
+    dtypes.update({"Period": np.int8, "Frame": np.int64, "Time [s]": np.float64})
+    return dtypes
+
+
+def _tracking_columns(header, teamname):
+    # column names of a tracking file, from its three header rows
+    teamnamefull = header[0][3].lower()
     print("Reading team: %s" % teamnamefull)
     # construct column names
     jerseys = [
-        x for x in next(reader) if x != ""
+        x for x in header[1] if x != ""
     ]  # extract player jersey numbers from second row
-    columns = next(reader)
+    columns = list(header[2])
     for i, j in enumerate(
         jerseys
     ):  # create x & y position column headers for each player
@@ -69,11 +174,7 @@ def tracking_data(DATADIR, game_id, teamname):
         columns[i * 2 + 4] = "{}_{}_y".format(teamname, j)
     columns[-2] = "ball_x"  # column headers for the x & y positions of the ball
     columns[-1] = "ball_y"
-    # Second: read in tracking data and place into pandas Dataframe
-    tracking = pd.read_csv(
-        "{}/{}".format(DATADIR, teamfile), names=columns, index_col="Frame", skiprows=3
-    )
-    return tracking
+    return columns
 
 
 def merge_tracking_data(home, away):
@@ -114,6 +215,50 @@ def to_single_playing_direction(home, away, events):
     return home, away, events
 
 
+def normalise_coordinates(
+    home, away, events, field_dimen=(106.0, 68.0), single_playing_direction=True
+):
+    """
+    normalise_coordinates(home,away,events,field_dimen=(106.,68.),single_playing_direction=True):
+    convert positions from Metrica units to meters (as to_metric_coordinates) and, if single_playing_direction is True,
+    flip the second half so that each team always shoots in the same direction (as to_single_playing_direction), in a
+    single pass over the coordinate columns of each table. The coordinate columns are selected explicitly: the player
+    and ball positions ('*_x', '*_y') of the tracking data, and 'Start X', 'Start Y', 'End X' & 'End Y' of the events.
+    Velocity columns ('*_vx', '*_vy'), if present, are flipped but not rescaled. The second half starts at the first
+    row with Period 2 (nothing is flipped if there is none). The tables are updated in place and returned; each keeps
+    the floating point type of its coordinates (e.g. float32 tracking data stays float32).
+    """
+    for data in [home, away, events]:
+        if data is events:
+            x_columns = [c for c in ["Start X", "End X"] if c in data.columns]
+            y_columns = [c for c in ["Start Y", "End Y"] if c in data.columns]
+            v_columns = []
+        else:
+            x_columns = [c for c in data.columns if c.endswith("_x")]
+            y_columns = [c for c in data.columns if c.endswith("_y")]
+            v_columns = [c for c in data.columns if c.endswith(("_vx", "_vy"))]
+        columns = x_columns + y_columns + v_columns
+        # a single copy of the coordinates, in their own floating point type, which is then updated in place
+        dtype = np.result_type(np.float32, *data[columns].dtypes)
+        block = data[columns].to_numpy(dtype=dtype, copy=True)
+        # x -> (x-0.5)*length, y -> -(y-0.5)*width (origin at top-left), velocities unchanged
+        xs = slice(0, len(x_columns))
+        ys = slice(len(x_columns), len(x_columns) + len(y_columns))
+        shift = np.zeros(len(columns), dtype=dtype)
+        scale = np.ones(len(columns), dtype=dtype)
+        shift[xs], scale[xs] = 0.5, field_dimen[0]
+        shift[ys], scale[ys] = 0.5, -field_dimen[1]
+        block -= shift
+        block *= scale
+        if single_playing_direction:
+            second_half = data["Period"].to_numpy() == 2
+            if second_half.any():
+                # every row from the start of the second half is flipped
+                block[np.argmax(second_half) :] *= -1
+        data[columns] = block
+    return home, away, events
+
+
 def find_playing_direction(team, teamname):
     """
     Find the direction of play for the team (based on where the goalkeepers are at kickoff). +1 is left->right and -1 is right->left
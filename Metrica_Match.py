@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Module for holding the tracking data of a match as dense arrays, rather than as wide DataFrames with one column per
+player coordinate ("Home_5_x", "Home_5_vx", ...).
+
+Every player of both teams is given a 'slot' (home players first, then away players, each team in the order of their
+columns in the tracking data), and positions and velocities are stored as (frames, slots, 2) arrays. Frames
+and players are then found by index rather than by searching column names, and the arrays for a single frame are views
+into the match arrays (no copy).
+
+Classes
+---------
+
+The 'Match' class holds the arrays. Build one from the tracking DataFrames with Match.from_tracking(), and convert
+it back with Match.to_tracking(). It is a standalone container: the functions of the other modules still take the
+tracking DataFrames, but Match.team_state() gives the Metrica_PitchControl.TeamState of a team at any frame, which
+the pitch control functions accept directly.
+
+"""
+
+import numpy as np
+import pandas as pd
+import Metrica_PitchControl as mpc
+
+
+class Match(object):
+    """
+    Match(frames, period, time, teams, player_ids, position, velocity, ball)
+
+    Tracking data of a match as dense arrays.
+
+    __init__ Parameters
+    -----------
+    frames: (frames,) array of tracking frame numbers
+    period: (frames,) array of the period (half) of each frame
+    time: (frames,) array of the time of each frame in seconds
+    teams: (slots,) array of the team of each player slot, "Home" or "Away"
+    player_ids: (slots,) array of the id (jersey number, as a string) of the player in each slot
+    position: (frames,slots,2) array of player positions (NaN when the player is not on the pitch)
+    velocity: (frames,slots,2) array of player velocities, or None if velocities have not been calculated
+    ball: (frames,2) array of ball positions
+
+    Attributes
+    -----------
+    The parameters above, and
+    home, away: (slots,) boolean masks of the slots of each team
+    periods: dictionary from each period to the slice of frame rows that it covers (e.g. periods[2].start is the row
+             of the first frame of the second half)
+    columns: dictionary from each team to the column names of its tracking DataFrame, in their original order (set by
+             from_tracking(), None otherwise), so that to_tracking() can give them back in that order
+
+    Other constructors
+    -----------
+    Match.from_tracking(tracking_home, tracking_away, dtype=None): build from the home & away tracking DataFrames
+
+    methods include:
+    -----------
+    row(frame): row of the arrays that holds a frame
+    slot(teamname, player_id): slot of a player
+    at_frame(frame): (position, velocity, ball) at a frame, as views of the match arrays
+    players_on_pitch(frame, teamname): ids of a team's players that are on the pitch at a frame
+    team_state(frame, teamname, params, GKid): Metrica_PitchControl.TeamState of a team at a frame
+    to_tracking(): the home & away tracking DataFrames
+
+    """
+
+    def __init__(
+        self, frames, period, time, teams, player_ids, position, velocity, ball
+    ):
+        self.frames = np.asarray(frames)
+        self.period = np.asarray(period)
+        self.time = np.asarray(time)
+        self.teams = np.asarray(teams)
+        self.player_ids = np.asarray(player_ids)
+        self.position = np.asarray(position)
+        self.velocity = None if velocity is None else np.asarray(velocity)
+        self.ball = np.asarray(ball)
+        n_frames, n_slots = len(self.frames), len(self.player_ids)
+        assert self.position.shape == (
+            n_frames,
+            n_slots,
+            2,
+        ), "position must have dimen (frames,slots,2)"
+        assert (
+            self.velocity is None or self.velocity.shape == self.position.shape
+        ), "velocity must have the same dimen as position"
+        self.home = self.teams == "Home"
+        self.away = self.teams == "Away"
+        self.columns = None
+        # look-up tables from frame number to row, and from (team, player id) to slot
+        self._rows = dict(zip(self.frames.tolist(), range(n_frames)))
+        self._slots = dict(
+            zip(zip(self.teams.tolist(), self.player_ids.tolist()), range(n_slots))
+        )
+        # period boundaries: frames are in time order, so each period is a contiguous block of rows
+        self.periods = {}
+        for p in np.unique(self.period):
+            rows = np.flatnonzero(self.period == p)
+            self.periods[p.item()] = slice(int(rows[0]), int(rows[-1]) + 1)
+
+    def __len__(self):
+        return len(self.frames)
+
+    @classmethod
+    def from_tracking(cls, tracking_home, tracking_away, dtype=None):
+        """
+        from_tracking(tracking_home, tracking_away, dtype=None)
+
+        Builds a Match from the home and away tracking DataFrames (with or without velocities), which must cover the
+        same frames. dtype is the floating point type of the arrays. Default is None (that of the tracking data).
+
+        """
+        assert tracking_home.index.equals(
+            tracking_away.index
+        ), "tracking_home and tracking_away must have the same frames"
+        team_ids = {
+            "Home": _team_player_ids(tracking_home, "Home"),
+            "Away": _team_player_ids(tracking_away, "Away"),
+        }
+        # velocities are only kept if they have been calculated for both teams
+        tracking = {"Home": tracking_home, "Away": tracking_away}
+        has_velocity = all(
+            "%s_%s_vx" % (teamname, pid) in tracking[teamname].columns
+            for teamname in ("Home", "Away")
+            for pid in team_ids[teamname]
+        )
+        teams, player_ids, positions, velocities = [], [], [], []
+        for teamname in ("Home", "Away"):
+            ids, table = team_ids[teamname], tracking[teamname]
+            teams += [teamname] * len(ids)
+            player_ids += ids
+            positions.append(_coordinates(table, teamname, ids, ("x", "y"), dtype))
+            if has_velocity:
+                velocities.append(
+                    _coordinates(table, teamname, ids, ("vx", "vy"), dtype)
+                )
+        match = cls(
+            tracking_home.index.to_numpy(),
+            tracking_home["Period"].to_numpy(),
+            tracking_home["Time [s]"].to_numpy(),
+            teams,
+            player_ids,
+            np.concatenate(positions, axis=1),
+            np.concatenate(velocities, axis=1) if has_velocity else None,
+            tracking_home[["ball_x", "ball_y"]].to_numpy(dtype=dtype),
+        )
+        # e.g. Metrica_Velocities adds the velocity columns in a different player order to the position columns
+        match.columns = {
+            teamname: list(tracking[teamname].columns) for teamname in ("Home", "Away")
+        }
+        return match
+
+    def row(self, frame):
+        """ Row of the arrays holding a tracking frame """
+        return self._rows[frame]
+
+    def slot(self, teamname, player_id):
+        """ Slot of a player, given their team and id (jersey number) """
+        return self._slots[(teamname, str(player_id))]
+
+    def at_frame(self, frame):
+        """
+        at_frame(frame)
+
+        Returns the player positions (slots,2), player velocities (slots,2) (None if there are no velocities) and ball
+        position (2,) at a tracking frame. These are views of the match arrays, not copies.
+
+        """
+        row = self._rows[frame]
+        velocity = None if self.velocity is None else self.velocity[row]
+        return self.position[row], velocity, self.ball[row]
+
+    def players_on_pitch(self, frame, teamname):
+        """ Ids of the players of a team that are on the pitch (have a position) at a tracking frame """
+        row = self._rows[frame]
+        on_pitch = (self.teams == teamname) & ~np.any(
+            np.isnan(self.position[row]), axis=1
+        )
+        return self.player_ids[on_pitch].tolist()
+
+    def team_state(self, frame, teamname, params, GKid):
+        """
+        team_state(frame, teamname, params, GKid)
+
+        Returns a Metrica_PitchControl.TeamState for a team at a tracking frame (as initialise_team_state() does for
+        a row of the tracking DataFrame), with the players in slot order.
+
+        """
+        row = self._rows[frame]
+        mask = self.teams == teamname
+        velocity = (
+            np.zeros_like(self.position[row, mask])
+            if self.velocity is None
+            else self.velocity[row, mask]
+        )
+        return mpc.TeamState(
+            teamname,
+            self.player_ids[mask],
+            self.position[row, mask],
+            velocity,
+            self.player_ids[mask] == str(GKid),
+            params,
+        )
+
+    def to_tracking(self):
+        """
+        to_tracking()
+
+        Returns the home and away tracking DataFrames, in the layout used by Metrica_IO and Metrica_Velocities: 'Period',
+        'Time [s]', the x & y position of each player, 'ball_x' and 'ball_y', and (if there are velocities) the vx, vy
+        and speed of each player. Players are in slot order, unless the Match was built with from_tracking(), in which
+        case the columns are put back in the order of the original DataFrames.
+
+        """
+        index = pd.Index(self.frames, name="Frame")
+        tables = []
+        for teamname in ("Home", "Away"):
+            slots = np.flatnonzero(self.teams == teamname)
+            data = {"Period": self.period, "Time [s]": self.time}
+            for slot in slots:
+                name = "%s_%s_" % (teamname, self.player_ids[slot])
+                data[name + "x"] = self.position[:, slot, 0]
+                data[name + "y"] = self.position[:, slot, 1]
+            data["ball_x"] = self.ball[:, 0]
+            data["ball_y"] = self.ball[:, 1]
+            if self.velocity is not None:
+                for slot in slots:
+                    name = "%s_%s_" % (teamname, self.player_ids[slot])
+                    vx, vy = self.velocity[:, slot, 0], self.velocity[:, slot, 1]
+                    data[name + "vx"] = vx
+                    data[name + "vy"] = vy
+                    data[name + "speed"] = np.sqrt(vx ** 2 + vy ** 2)
+            table = pd.DataFrame(data, index=index)
+            if self.columns is not None:
+                order = [c for c in self.columns[teamname] if c in data]
+                table = table[order + [c for c in data if c not in order]]
+            tables.append(table)
+        return tables[0], tables[1]
+
+
+def _team_player_ids(tracking, teamname):
+    # player ids (jersey numbers, as strings) of a team, in the order of their first column in the tracking DataFrame
+    ids = [c.split("_")[1] for c in tracking.columns if c[:4] == teamname]
+    return list(dict.fromkeys(ids))
+
+
+def _coordinates(tracking, teamname, player_ids, quantities, dtype):
+    # (frames, players, 2) array of two quantities (e.g. x & y) of each player
+    columns = [
+        "%s_%s_%s" % (teamname, pid, q) for pid in player_ids for q in quantities
+    ]
+    return (
+        tracking[columns]
+        .to_numpy(dtype=dtype)
+        .reshape(len(tracking), len(player_ids), 2)
+    )
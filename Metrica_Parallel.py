@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Module for generating pitch control surfaces for whole matches (every event, or every Nth frame) on several cores.
+
+The frames are split into chunks and spread across a pool of worker processes, each of which evaluates its chunks with
+Metrica_PitchControl.generate_pitch_control_for_frames(). The tracking data are not sent to the workers with each task:
+the player and ball columns are copied once (in their own floating point type) into shared memory blocks, which every
+worker attaches to when it starts. The workers write their surfaces straight into the output array, which is
+allocated (zeroed) in shared memory and returned without being copied.
+
+Functions
+----------
+
+generate_pitch_control_for_match(): evaluates pitch control surfaces for a list of tracking frames (e.g. every Nth
+frame of a match) on a pool of worker processes
+
+generate_pitch_control_for_events(): evaluates pitch control surfaces at the moment of each event in a list (as in
+Metrica_PitchControl.generate_pitch_control_for_event), on a pool of worker processes
+
+"""
+
+import multiprocessing as mp
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+import Metrica_PitchControl as mpc
+
+# tracking data and output array of the current worker process, attached in _attach_worker()
+_worker = {}
+
+
+def generate_pitch_control_for_match(
+    frames,
+    tracking_home,
+    tracking_away,
+    attacking_team,
+    params,
+    GK_numbers,
+    ball_start_positions=None,
+    field_dimen=(106.0, 68.0,),
+    n_grid_cells_x=50,
+    offsides=True,
+    n_processes=None,
+    chunk_size=None,
+    max_bytes=None,
+):
+    """ generate_pitch_control_for_match
+
+    Evaluates pitch control surfaces over the entire field for a list (or range) of tracking frames, spreading the
+    frames across a pool of worker processes. Gives the same result as Metrica_PitchControl.generate_pitch_control_for_frames().
+
+    Parameters
+    -----------
+        frames: list, range or array of tracking frame numbers (index of the tracking DataFrames), e.g. tracking_home.index[::25]
+        tracking_home: tracking DataFrame for the Home team
+        tracking_away: tracking DataFrame for the Away team
+        attacking_team: team in possession, "Home" or "Away". Either a single string for all frames or a sequence with one entry per frame
+        params: Dictionary of model parameters (default model parameters can be generated using default_model_params() )
+        GK_numbers: tuple containing the player id of the goalkeepers for the (home team, away team)
+        ball_start_positions: (frames,2) array of ball positions. Default is None, in which case the ball position in the tracking data is used.
+        field_dimen: tuple containing the length and width of the pitch in meters. Default is (106,68)
+        n_grid_cells_x: Number of pixels in the grid (in the x-direction) that covers the surface. Default is 50.
+                        n_grid_cells_y will be calculated based on n_grid_cells_x and the field dimensions
+        offsides: If True, find and remove offside atacking players from the calculation. Default is True.
+        n_processes: Number of worker processes. Default is None (one per CPU core).
+        chunk_size: Number of frames in each task sent to the workers. Default is None (about four tasks per worker).
+        max_bytes: Approximate memory budget of each worker (see Metrica_PitchControl.generate_pitch_control_for_frames). Default is None.
+
+    Returrns
+    -----------
+        PPCFa: Pitch control surfaces (dimen (frames,n_grid_cells_y,n_grid_cells_x) ) containing pitch control probability for the attcking team.
+               Surfaces for the defending team are just 1-PPCFa.
+        xgrid: Positions of the pixels in the x-direction (field length)
+        ygrid: Positions of the pixels in the y-direction (field width)
+
+    """
+    frames = np.asarray(frames)
+    if isinstance(attacking_team, str):
+        attacking_team = [attacking_team] * len(frames)
+    assert len(attacking_team) == len(
+        frames
+    ), "attacking_team must be a single team name or have one entry per frame"
+    if ball_start_positions is not None:
+        ball_start_positions = np.asarray(ball_start_positions, dtype=float)
+    if n_processes is None:
+        n_processes = mp.cpu_count()
+    if chunk_size is None:
+        chunk_size = max(int(np.ceil(len(frames) / (4.0 * n_processes))), 1)
+    xgrid, ygrid, _ = mpc.generate_pitch_grid(field_dimen, n_grid_cells_x)
+    # the output is allocated in (zeroed) shared memory, from the multiprocessing heap, so the workers write into the
+    # array that is returned. It is freed when the returned array is.
+    dtype = np.dtype(params.get("dtype", "float64"))
+    out_shape = (len(frames), len(ygrid), len(xgrid))
+    out = mp.RawArray("b", max(int(np.prod(out_shape)) * dtype.itemsize, 1))
+    shared = {}
+    try:
+        # copy the columns used by the model (players and ball) into shared memory, once, keeping their floating point
+        # type (e.g. float32 tracking data stay float32). Columns are copied one at a time, so no temporary copy of
+        # the whole tracking DataFrame is made.
+        for teamname, tracking in (("Home", tracking_home), ("Away", tracking_away)):
+            _, columns = mpc.get_team_columns(tracking, teamname)
+            if teamname == "Home":
+                columns += ["ball_x", "ball_y"]
+            block_dtype = np.result_type(*tracking[columns].dtypes)
+            if not np.issubdtype(block_dtype, np.floating):
+                block_dtype = np.dtype(float)
+            block = _shared_block(
+                shared, teamname, (len(tracking), len(columns)), block_dtype, columns
+            )
+            for j, c in enumerate(columns):
+                block[:, j] = tracking[c].to_numpy()
+        index = tracking_home.index.to_numpy()
+        _shared_block(shared, "index", index.shape, index.dtype, None)[...] = index
+        layout = {
+            name: (shm.name, shape, dtype, columns)
+            for name, (shm, shape, dtype, columns) in shared.items()
+        }
+        tasks = [
+            (
+                start,
+                frames[start : start + chunk_size],
+                attacking_team[start : start + chunk_size],
+                None
+                if ball_start_positions is None
+                else ball_start_positions[start : start + chunk_size],
+            )
+            for start in range(0, len(frames), chunk_size)
+        ]
+        settings = (
+            params,
+            GK_numbers,
+            field_dimen,
+            n_grid_cells_x,
+            offsides,
+            max_bytes,
+        )
+        with mp.Pool(
+            n_processes,
+            initializer=_attach_worker,
+            initargs=(layout, (out, out_shape, dtype.str), settings),
+        ) as pool:
+            for _ in pool.imap_unordered(_evaluate_chunk, tasks):
+                pass
+    finally:
+        for shm, _, _, _ in shared.values():
+            shm.close()
+            shm.unlink()
+    PPCFa = _output_array(out, out_shape, dtype)
+    return PPCFa, xgrid, ygrid
+
+
+def generate_pitch_control_for_events(
+    event_ids,
+    events,
+    tracking_home,
+    tracking_away,
+    params,
+    GK_numbers,
+    field_dimen=(106.0, 68.0,),
+    n_grid_cells_x=50,
+    offsides=True,
+    n_processes=None,
+    chunk_size=None,
+    max_bytes=None,
+):
+    """ generate_pitch_control_for_events
+
+    Evaluates pitch control surfaces over the entire field at the moment of each of the given events, as in
+    Metrica_PitchControl.generate_pitch_control_for_event(), spreading the events across a pool of worker processes.
+
+    Parameters
+    -----------
+        event_ids: Indices (not rows) of the events, e.g. events.index for every event of the match
+        events: Dataframe containing the event data
+        tracking_home: tracking DataFrame for the Home team
+        tracking_away: tracking DataFrame for the Away team
+        params: Dictionary of model parameters (default model parameters can be generated using default_model_params() )
+        GK_numbers: tuple containing the player id of the goalkeepers for the (home team, away team)
+        field_dimen: tuple containing the length and width of the pitch in meters. Default is (106,68)
+        n_grid_cells_x: Number of pixels in the grid (in the x-direction) that covers the surface. Default is 50.
+        offsides: If True, find and remove offside atacking players from the calculation. Default is True.
+        n_processes: Number of worker processes. Default is None (one per CPU core).
+        chunk_size: Number of events in each task sent to the workers. Default is None (about four tasks per worker).
+        max_bytes: Approximate memory budget of each worker (see Metrica_PitchControl.generate_pitch_control_for_frames). Default is None.
+
+    Returrns
+    -----------
+        PPCFa: Pitch control surfaces (dimen (events,n_grid_cells_y,n_grid_cells_x) ) containing pitch control probability for the attcking team.
+        xgrid: Positions of the pixels in the x-direction (field length)
+        ygrid: Positions of the pixels in the y-direction (field width)
+
+    """
+    event_rows = events.loc[event_ids]
+    return generate_pitch_control_for_match(
+        event_rows["Start Frame"].to_numpy(),
+        tracking_home,
+        tracking_away,
+        list(event_rows.Team),
+        params,
+        GK_numbers,
+        ball_start_positions=event_rows[["Start X", "Start Y"]].to_numpy(dtype=float),
+        field_dimen=field_dimen,
+        n_grid_cells_x=n_grid_cells_x,
+        offsides=offsides,
+        n_processes=n_processes,
+        chunk_size=chunk_size,
+        max_bytes=max_bytes,
+    )
+
+
+def _shared_block(shared, name, shape, dtype, columns):
+    # create a shared memory block holding an array, record it in 'shared' and return the array (a view of the block)
+    dtype = np.dtype(dtype)
+    shm = shared_memory.SharedMemory(
+        create=True, size=max(int(np.prod(shape)) * dtype.itemsize, 1)
+    )
+    shared[name] = (shm, shape, dtype.str, columns)
+    return np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+
+
+def _output_array(out, shape, dtype):
+    # the output array, as a view of the shared buffer allocated in generate_pitch_control_for_match()
+    count = int(np.prod(shape))
+    return np.frombuffer(out, dtype=dtype, count=count).reshape(shape)
+
+
+def _attach_worker(layout, out, settings):
+    # pool initializer: attach to the shared memory blocks and rebuild the tracking DataFrames around them (no copy of
+    # the tracking data is sent with each task)
+    arrays = {}
+    for name, (shm_name, shape, dtype, columns) in layout.items():
+        shm = shared_memory.SharedMemory(name=shm_name)
+        # keep a reference, so the block stays mapped for the life of the worker
+        _worker.setdefault("shm", []).append(shm)
+        arrays[name] = (np.ndarray(shape, dtype=dtype, buffer=shm.buf), columns)
+    index = pd.Index(arrays["index"][0])
+    for teamname in ("Home", "Away"):
+        array, columns = arrays[teamname]
+        _worker[teamname] = pd.DataFrame(
+            array, index=index, columns=columns, copy=False
+        )
+    _worker["out"] = _output_array(*out)
+    _worker["settings"] = settings
+
+
+def _evaluate_chunk(task):
+    # evaluate the surfaces for one chunk of frames and write them into the shared output array
+    start, frames, attacking_team, ball_start_positions = task
+    params, GK_numbers, field_dimen, n_grid_cells_x, offsides, max_bytes = _worker[
+        "settings"
+    ]
+    mpc.generate_pitch_control_for_frames(
+        frames,
+        _worker["Home"],
+        _worker["Away"],
+        attacking_team,
+        params,
+        GK_numbers,
+        ball_start_positions=ball_start_positions,
+        field_dimen=field_dimen,
+        n_grid_cells_x=n_grid_cells_x,
+        offsides=offsides,
+        max_bytes=max_bytes,
+        out=_worker["out"][start : start + len(frames)],
+    )
@@ -24,15 +24,65 @@ calculate_pitch_control_at_target(): calculate the pitch control probability for
 generate_pitch_control_for_event(): this function evaluates pitch control surface over the entire field at the moment
 of the given event (determined by the index of the event passed as an input)
 
+event_cache_key(): key under which generate_pitch_control_for_event() stores the pitch control of an event in a cache, so
+that other analyses of the event (e.g. PlayerEventAnalysis) can share it
+
+generate_pitch_control_for_frames(): evaluates pitch control surfaces for a list of tracking frames in one call, returning
+a (frames, n_grid_cells_y, n_grid_cells_x) array
+
+generate_interpolated_pitch_control_for_frames(): evaluates pitch control surfaces for a dense sequence of frames, computing
+exact surfaces only at key frames (chosen adaptively) and interpolating in time between them
+
+generate_adaptive_pitch_control_for_event(): evaluates a high-resolution pitch control surface by refining a coarse grid only
+where the surface changes quickly (e.g. around the 0.5 boundary between the teams)
+
+calculate_pitch_control_at_targets(): calculate the pitch control probabilities at many arbitrary target positions (each
+with its own ball start position if required) in one vectorized call.
+
+calculate_pitch_control_surface(): vectorized evaluation of pitch control at many target positions at once. Arrival times
+at all targets are computed first (calculate_arrival_times), targets decided by the 'time_to_control' short-cut are
+picked out (find_decided_targets), and equation 3 is then integrated only over the contested targets, dropping each
+target once it converges. A memory budget ('max_bytes') can be given, in which case the targets are evaluated in tiles.
+With return_diagnostics=True it also reports the work done at each target (integration steps, short-cut targets,
+pruned players and targets that failed to converge).
+
+update_pitch_control_surface(): updates a pitch control surface after one player's position/velocity has changed,
+recomputing only the targets that the player can affect.
+
+None of these functions keep any state outside each call (the 'player' objects passed to
+calculate_pitch_control_at_target() are not changed), so they can be run from several threads at once, e.g. with
+the 'n_threads' option of generate_pitch_control_for_frames().
+
 Classes
 ---------
 
 The 'player' class collects and stores trajectory information for each player required by the pitch control calculations.
 
+The 'TeamState' class holds the same information for a whole team as contiguous arrays (one row per player), so that
+the pitch control calculations can be vectorized over players. It can be built directly from a tracking row or from a
+pre-extracted array, using the player columns found once with get_team_columns().
+
+The 'ModelParams' class is an immutable, hashable stand-in for the dictionary of model parameters, with the derived
+constants computed once and a stable fingerprint for cache keys and stored outputs.
+
+The 'PitchGrid' class holds the geometry of the grid of cells covering the pitch (cell-centre coordinates) and the ball
+travel-time field from recent ball positions to every cell. Grids are cached per (field_dimen, n_grid_cells_x) and
+obtained with get_pitch_grid().
+
 @author: Laurie Shaw (@EightyFivePoint)
 
 """
 
+import contextlib
+import functools
+import hashlib
+import json
+import threading
+import warnings
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from collections.abc import Mapping
+
 import numpy as np
 
 
@@ -67,6 +117,30 @@ def initialise_players(team, teamname, params, GKid):
     return team_players
 
 
+def initialise_team_state(team, teamname, params, GKid):
+    """
+    initialise_team_state(team,teamname,params,GKid)
+
+    create a TeamState object that holds the positions and velocities of the players of a team as arrays. Equivalent
+    to initialise_players(), but with one object per team rather than one per player.
+
+    Parameters
+    -----------
+
+    team: row (i.e. instant) of either the home or away team tracking Dataframe
+    teamname: team name "Home" or "Away"
+    params: Dictionary of model parameters (default model parameters can be generated using default_model_params() )
+    GKid: id (jersey number) of the team's goalkeeper
+
+    Returns
+    -----------
+
+    team_state: TeamState object for the team at at given instant
+
+    """
+    return TeamState.from_row(team, teamname, params, GKid)
+
+
 def check_offsides(
     attacking_players,
     defending_players,
@@ -93,7 +167,21 @@ def check_offsides(
     Returrns
     -----------
         attacking_players: list of 'player' objects for the players on the attacking team with offside players removed
+
+    attacking_players and defending_players can also be given as TeamState objects, in which case a TeamState with the
+    offside players removed is returned.
     """
+    if isinstance(attacking_players, TeamState):
+        onside = _onside_mask(
+            attacking_players, _as_team_state(defending_players), ball_position, tol
+        )
+        if verbose:
+            for pid in attacking_players.player_ids[~onside]:
+                print(
+                    "player %s in %s team is offside"
+                    % (pid, attacking_players.teamname)
+                )
+        return attacking_players.subset(onside)
     # find jersey number of defending goalkeeper (just to establish attack direction)
     defending_GK_id = (
         GK_numbers[1] if attacking_players[0].teamname == "Home" else GK_numbers[0]
@@ -142,7 +230,14 @@ class player(object):
     methods include:
     -----------
     simple_time_to_intercept(r_final): time take for player to get to target position (r_final) given current position
-    probability_intercept_ball(T): probability player will have controlled ball at time T given their expected time_to_intercept
+    accelerated_time_to_intercept(r_final): as simple_time_to_intercept, but accelerating (at amax) from the current velocity up to vmax
+    arrival_time(r_final, tti_model="simple"): time to intercept with the model given by tti_model ("simple" or
+                                              "acceleration"), without storing anything on the player
+    probability_intercept_ball(T, time_to_intercept=None): probability player will have controlled ball at time T given their expected time_to_intercept
+
+    The *_time_to_intercept methods store the result (and reset 'PPCF') on the player. The pitch control calculations
+    only use arrival_time() and pass the arrival time to probability_intercept_ball(), so the same player objects can
+    be shared by several threads.
 
     """
 
@@ -155,12 +250,16 @@ class player(object):
         self.vmax = params[
             "max_player_speed"
         ]  # player max speed in m/s. Could be individualised
+        self.amax = params[
+            "max_player_accel"
+        ]  # player max acceleration in m/s/s, used by accelerated_time_to_intercept
         self.reaction_time = params[
             "reaction_time"
         ]  # player reaction time in 's'. Could be individualised
         self.tti_sigma = params[
             "tti_sigma"
         ]  # standard deviation of sigmoid function (see Eq 4 in Spearman, 2018)
+        self.tti_slope = _tti_slope(params)  # slope of the sigmoid function
         self.lambda_att = params[
             "lambda_att"
         ]  # standard deviation of sigmoid function (see Eq 4 in Spearman, 2018)
@@ -186,29 +285,176 @@ class player(object):
 
     def simple_time_to_intercept(self, r_final):
         self.PPCF = 0.0  # initialise this for later
+        self.time_to_intercept = self.arrival_time(r_final, "simple")
+        return self.time_to_intercept
+
+    def accelerated_time_to_intercept(self, r_final):
+        self.PPCF = 0.0  # initialise this for later
+        self.time_to_intercept = self.arrival_time(r_final, "acceleration")
+        return self.time_to_intercept
+
+    def arrival_time(self, r_final, tti_model="simple"):
         # Time to intercept assumes that the player continues moving at current velocity for 'reaction_time' seconds
         # and then runs at full speed to the target position.
         r_reaction = self.position + self.velocity * self.reaction_time
-        self.time_to_intercept = (
-            self.reaction_time + np.linalg.norm(r_final - r_reaction) / self.vmax
+        if tti_model != "acceleration":
+            return self.reaction_time + np.linalg.norm(r_final - r_reaction) / self.vmax
+        # With the "acceleration" model the player runs straight to the target position, accelerating at amax from
+        # their current speed towards the target (their velocity across that direction is ignored) until they reach vmax.
+        distance = np.linalg.norm(r_final - r_reaction)
+        if distance > 0:
+            u = min(np.dot(self.velocity, r_final - r_reaction) / distance, self.vmax)
+        else:
+            u = self.vmax
+        # distance covered while accelerating up to vmax
+        distance_accel = (self.vmax ** 2 - u ** 2) / (2 * self.amax)
+        if distance <= distance_accel:
+            t = (np.sqrt(u ** 2 + 2 * self.amax * distance) - u) / self.amax
+        else:
+            t = (self.vmax - u) / self.amax + (distance - distance_accel) / self.vmax
+        return self.reaction_time + t
+
+    def probability_intercept_ball(self, T, time_to_intercept=None):
+        # probability of a player arriving at target location at time 'T' given their expected time_to_intercept (time of arrival), as described in Spearman 2018
+        if time_to_intercept is None:
+            time_to_intercept = self.time_to_intercept
+        f = 1 / (1.0 + np.exp(-self.tti_slope * (T - time_to_intercept)))
+        return f
+
+
+class TeamState(object):
+    """
+    TeamState() class
+
+    Class holding the positions, velocities and model parameters of all the players of a team at a given instant as
+    contiguous arrays (one row per player), rather than as a list of 'player' objects. Players that are not on the field
+    (NaN position) are dropped, and NaN velocities are set to zero, as in the 'player' class.
+
+    __init__ Parameters
+    -----------
+    teamname: team name "Home" or "Away"
+    player_ids: array of ids (jersey numbers, as strings) of the players
+    position: (players,2) array of player positions
+    velocity: (players,2) array of player velocities
+    is_gk: (players,) boolean array, True for the goalkeeper
+    params: Dictionary of model parameters (default model parameters can be generated using default_model_params() )
+
+    Other constructors
+    -----------
+    TeamState.from_row(team, teamname, params, GKid, team_columns=None): build from a row of the tracking DataFrame
+    TeamState.from_array(block, player_ids, teamname, params, GKid): build from a (players,[x,y,vx,vy]) array
+    TeamState.from_players(players): build from a list of 'player' objects
+
+    """
+
+    def __init__(self, teamname, player_ids, position, velocity, is_gk, params):
+        position = np.asarray(position, dtype=float).reshape(-1, 2)
+        velocity = np.asarray(velocity, dtype=float).reshape(-1, 2)
+        inframe = ~np.any(np.isnan(position), axis=1)
+        n = np.count_nonzero(inframe)
+        self.teamname = teamname
+        self.player_ids = np.asarray(player_ids)[inframe]
+        self.position = position[inframe]
+        self.velocity = np.where(
+            np.any(np.isnan(velocity[inframe]), axis=1)[:, None],
+            0.0,
+            velocity[inframe],
+        )
+        self.is_gk = np.asarray(is_gk, dtype=bool)[inframe]
+        self.vmax = np.full(n, params["max_player_speed"])
+        self.amax = np.full(n, params["max_player_accel"])
+        self.reaction_time = np.full(n, params["reaction_time"])
+        self.tti_sigma = np.full(n, params["tti_sigma"])
+        self.tti_slope = np.full(n, _tti_slope(params))
+        self.lambda_att = np.full(n, params["lambda_att"])
+        self.lambda_def = np.where(
+            self.is_gk, params["lambda_gk"], params["lambda_def"]
         )
-        return self.time_to_intercept
 
-    def probability_intercept_ball(self, T):
-        # probability of a player arriving at target location at time 'T' given their expected time_to_intercept (time of arrival), as described in Spearman 2018
-        f = 1 / (
-            1.0
-            + np.exp(
-                -np.pi / np.sqrt(3.0) / self.tti_sigma * (T - self.time_to_intercept)
-            )
+    @classmethod
+    def from_row(cls, team, teamname, params, GKid, team_columns=None):
+        # team_columns: (player_ids, columns) as returned by get_team_columns(). Pass these in when building states for
+        # many rows of the same DataFrame so that the column names are only parsed once.
+        if team_columns is None:
+            team_columns = get_team_columns(team.keys(), teamname)
+        player_ids, columns = team_columns
+        block = np.asarray(team[columns], dtype=float)
+        return cls.from_array(block, player_ids, teamname, params, GKid)
+
+    @classmethod
+    def from_array(cls, block, player_ids, teamname, params, GKid):
+        block = np.asarray(block, dtype=float).reshape(len(player_ids), 4)
+        is_gk = np.asarray(player_ids) == str(GKid)
+        return cls(teamname, player_ids, block[:, :2], block[:, 2:], is_gk, params)
+
+    @classmethod
+    def from_players(cls, players):
+        self = cls.__new__(cls)
+        self.teamname = players[0].teamname if len(players) else None
+        self.player_ids = np.array([p.id for p in players])
+        self.position = np.array([p.position for p in players], dtype=float).reshape(
+            -1, 2
         )
-        return f
+        self.velocity = np.array([p.velocity for p in players], dtype=float).reshape(
+            -1, 2
+        )
+        self.is_gk = np.array([p.is_gk for p in players], dtype=bool)
+        for attr in (
+            "vmax",
+            "amax",
+            "reaction_time",
+            "tti_sigma",
+            "tti_slope",
+            "lambda_att",
+            "lambda_def",
+        ):
+            setattr(self, attr, np.array([getattr(p, attr) for p in players], dtype=float))
+        return self
+
+    def __len__(self):
+        return len(self.player_ids)
+
+    def subset(self, mask):
+        # new TeamState holding only the players selected by 'mask' (boolean or index array)
+        new = self.__class__.__new__(self.__class__)
+        for attr, value in self.__dict__.items():
+            new.__dict__[attr] = value[mask] if isinstance(value, np.ndarray) else value
+        return new
+
+
+def get_team_columns(columns, teamname):
+    """
+    get_team_columns(columns, teamname)
+
+    Find the player ids of a team and the tracking column names that hold their positions & velocities.
+
+    Parameters
+    -----------
+    columns: column names of the tracking DataFrame (or a tracking DataFrame)
+    teamname: team name "Home" or "Away"
+
+    Returns
+    -----------
+    player_ids: list of player ids (jersey numbers, as strings)
+    columns: list of column names, in [x, y, vx, vy] order for each player in turn
+
+    """
+    columns = getattr(columns, "columns", columns)
+    player_ids = np.unique([c.split("_")[1] for c in columns if c[:4] == teamname])
+    team_columns = [
+        "%s_%s_%s" % (teamname, pid, q)
+        for pid in player_ids
+        for q in ("x", "y", "vx", "vy")
+    ]
+    return list(player_ids), team_columns
 
 
 """ Generate pitch control map """
 
 
-def default_model_params(time_to_control_veto=3):
+def default_model_params(
+    time_to_control_veto=3, integrator="euler", dtype="float64", tti_model="simple"
+):
     """
     default_model_params()
 
@@ -217,6 +463,18 @@ def default_model_params(time_to_control_veto=3):
     Parameters
     -----------
     time_to_control_veto: If the probability that another team or player can get to the ball and control it is less than 10^-time_to_control_veto, ignore that player.
+    integrator: Time integration scheme used by calculate_pitch_control_surface and calculate_pitch_control_at_target.
+                Either "euler" (default, the explicit scheme with timestep 'int_dt') or "exponential" (exact for rates
+                held fixed over each step of 'exp_int_dt', so it can take much longer steps for the same accuracy).
+    dtype: Floating point type used by the vectorized engine for its working arrays and the surfaces it returns, either
+           "float64" (default) or "float32". float32 halves memory use and bandwidth; against float64, team surfaces
+           typically differ by ~1e-6, and by up to ~1e-4 (~2e-3 for single players) at the few cells where a convergence
+           or short-cut test falls on the other side of its threshold, well below 'model_converge_tol'. The loop over
+           player objects in calculate_pitch_control_at_target always works in float64.
+    tti_model: Model of the time taken by each player to reach a target. Either "simple" (default: after the reaction
+               time, players run straight to the target at 'max_player_speed') or "acceleration" (after the reaction
+               time, players accelerate at 'max_player_accel' from their current speed towards the target up to
+               'max_player_speed').
 
 
     Returns
@@ -230,7 +488,7 @@ def default_model_params(time_to_control_veto=3):
     # model parameters
     params[
         "max_player_accel"
-    ] = 7.0  # maximum player acceleration m/s/s, not used in this implementation
+    ] = 7.0  # maximum player acceleration m/s/s, only used by the "acceleration" time-to-intercept model
     params["max_player_speed"] = 5.0  # maximum player speed m/s
     params[
         "reaction_time"
@@ -249,25 +507,271 @@ def default_model_params(time_to_control_veto=3):
         params["lambda_def"] * 3.0
     )  # make goal keepers must quicker to control ball (because they can catch it)
     params["average_ball_speed"] = 15.0  # average ball travel speed in m/s
+    params["tti_model"] = tti_model  # time-to-intercept model, "simple" or "acceleration"
     # numerical parameters for model evaluation
+    params["integrator"] = integrator  # time integration scheme, "euler" or "exponential"
+    params[
+        "dtype"
+    ] = np.dtype(dtype).name  # floating point type of the vectorized engine, "float64" or "float32"
     params["int_dt"] = 0.04  # integration timestep (dt)
+    params[
+        "exp_int_dt"
+    ] = 0.2  # integration timestep for the exponential integrator. Error against the exact solution is ~model_converge_tol (about half that of euler with int_dt)
     params["max_int_time"] = 10  # upper limit on integral time
     params[
         "model_converge_tol"
     ] = 0.01  # assume convergence when PPCF>0.99 at a given location.
+    params["time_to_control_veto"] = time_to_control_veto
+    # derived constants ('time_to_control_att' and 'time_to_control_def')
+    _set_derived_params(params)
+    return params
+
+
+def _set_derived_params(params):
     # The following are 'short-cut' parameters. We do not need to calculated PPCF explicitly when a player has a sufficient head start.
     # A sufficient head start is when the a player arrives at the target location at least 'time_to_control' seconds before the next player
-    params["time_to_control_att"] = (
-        time_to_control_veto
-        * np.log(10)
-        * (np.sqrt(3) * params["tti_sigma"] / np.pi + 1 / params["lambda_att"])
-    )
-    params["time_to_control_def"] = (
-        time_to_control_veto
-        * np.log(10)
-        * (np.sqrt(3) * params["tti_sigma"] / np.pi + 1 / params["lambda_def"])
+    if "time_to_control_veto" in params:
+        params["time_to_control_att"] = (
+            params["time_to_control_veto"]
+            * np.log(10)
+            * (np.sqrt(3) * params["tti_sigma"] / np.pi + 1 / params["lambda_att"])
+        )
+        params["time_to_control_def"] = (
+            params["time_to_control_veto"]
+            * np.log(10)
+            * (np.sqrt(3) * params["tti_sigma"] / np.pi + 1 / params["lambda_def"])
+        )
+
+
+class ModelParams(Mapping):
+    """
+    ModelParams(params=None, **changes)
+
+    Immutable (and hashable) version of the dictionary of model parameters, which can be passed to any function in
+    place of the dictionary. The derived constants ('time_to_control_att' and 'time_to_control_def', and the slope of
+    the arrival time sigmoid, held in the 'tti_slope' attribute) are computed once, when it is built, from the other
+    parameters, so they cannot go out of step with them: to change the short-cut times, change
+    'time_to_control_veto', 'tti_sigma' or the 'lambda' parameters instead.
+
+    __init__ Parameters
+    -----------
+    params: Dictionary (or ModelParams) of model parameters. Default is None, in which case default_model_params() is used.
+    **changes: parameters to set, e.g. ModelParams(max_player_speed=6.0)
+
+    Attributes
+    -----------
+    fingerprint: hex string identifying the parameter values. It is stable between sessions and machines, so it can
+                 be used in cache keys and stored alongside precomputed outputs.
+    tti_slope: slope of the sigmoid function of arrival time (Eq 4 in Spearman, 2018), pi/sqrt(3)/tti_sigma
+
+    methods include:
+    -----------
+    replace(**changes): returns a new ModelParams with the given parameters changed
+
+    """
+
+    def __init__(self, params=None, **changes):
+        values = dict(default_model_params() if params is None else params)
+        values.update(changes)
+        if "dtype" in values:
+            # stored by name, so that it can be fingerprinted (e.g. np.float32 -> "float32")
+            values["dtype"] = np.dtype(values["dtype"]).name
+        _set_derived_params(values)
+        values = {
+            k: v.item() if isinstance(v, np.generic) else v for k, v in values.items()
+        }
+        fingerprint = hashlib.sha1(
+            json.dumps(values, sort_keys=True).encode()
+        ).hexdigest()
+        object.__setattr__(self, "_params", values)
+        object.__setattr__(self, "fingerprint", fingerprint)
+        object.__setattr__(
+            self, "tti_slope", np.pi / np.sqrt(3.0) / values["tti_sigma"]
+        )
+
+    def __getitem__(self, key):
+        return self._params[key]
+
+    def __iter__(self):
+        return iter(self._params)
+
+    def __len__(self):
+        return len(self._params)
+
+    def __hash__(self):
+        return hash(self.fingerprint)
+
+    def __setattr__(self, name, value):
+        raise AttributeError(
+            "ModelParams is immutable, use replace() to change parameters"
+        )
+
+    def __reduce__(self):
+        return (self.__class__, (self._params,))
+
+    def __repr__(self):
+        return "ModelParams(%r)" % (self._params,)
+
+    def replace(self, **changes):
+        return self.__class__(self._params, **changes)
+
+
+def generate_pitch_grid(field_dimen=(106.0, 68.0,), n_grid_cells_x=50):
+    """ generate_pitch_grid
+
+    Breaks the pitch down into a grid of cells, as used for the pitch control surfaces. The grid is built once for each
+    (field_dimen, n_grid_cells_x) and cached (see get_pitch_grid), so the arrays returned are shared and read-only.
+
+    Parameters
+    -----------
+        field_dimen: tuple containing the length and width of the pitch in meters. Default is (106,68)
+        n_grid_cells_x: Number of pixels in the grid (in the x-direction) that covers the surface. Default is 50.
+                        n_grid_cells_y will be calculated based on n_grid_cells_x and the field dimensions
+
+    Returrns
+    -----------
+        xgrid: Positions of the pixels in the x-direction (field length)
+        ygrid: Positions of the pixels in the y-direction (field width)
+        target_positions: (n_grid_cells_y*n_grid_cells_x,2) array of the (x,y) positions of the cell centres, in row
+                          order (reshape to (n_grid_cells_y,n_grid_cells_x) to get a surface)
+
+    """
+    grid = get_pitch_grid(field_dimen, n_grid_cells_x)
+    return grid.xgrid, grid.ygrid, grid.target_positions
+
+
+def get_pitch_grid(field_dimen=(106.0, 68.0,), n_grid_cells_x=50, n_grid_cells_y=None):
+    """ get_pitch_grid
+
+    Returns the PitchGrid for the given pitch dimensions and number of cells. Grids are cached, so every surface
+    computation (and EPV lookup) on the same grid shares one set of cell-centre arrays and ball travel-time fields.
+
+    Parameters
+    -----------
+        field_dimen: tuple containing the length and width of the pitch in meters. Default is (106,68)
+        n_grid_cells_x: Number of pixels in the grid (in the x-direction). Default is 50.
+        n_grid_cells_y: Number of pixels in the grid (in the y-direction). Default is None, in which case it is
+                        calculated based on n_grid_cells_x and the field dimensions
+
+    Returrns
+    -----------
+        grid: PitchGrid object
+
+    """
+    return _cached_pitch_grid(
+        tuple(float(d) for d in field_dimen),
+        int(n_grid_cells_x),
+        None if n_grid_cells_y is None else int(n_grid_cells_y),
     )
-    return params
+
+
+@functools.lru_cache(maxsize=32)
+def _cached_pitch_grid(field_dimen, n_grid_cells_x, n_grid_cells_y):
+    return PitchGrid(field_dimen, n_grid_cells_x, n_grid_cells_y)
+
+
+class PitchGrid(object):
+    """
+    PitchGrid(field_dimen, n_grid_cells_x, n_grid_cells_y=None)
+
+    Geometry of the grid of cells that covers the pitch. Use get_pitch_grid() rather than building a new PitchGrid, so
+    that grids (and their cached ball travel-time fields) are shared. The arrays are read-only.
+
+    Attributes
+    -----------
+    field_dimen: length and width of the pitch in meters
+    n_grid_cells_x, n_grid_cells_y: number of cells in the x- and y-directions
+    shape: (n_grid_cells_y, n_grid_cells_x), the shape of a surface on this grid
+    dx, dy: size of a cell in the x- and y-directions
+    xgrid, ygrid: positions of the cell centres in the x- and y-directions
+    target_positions: (n_grid_cells_y*n_grid_cells_x,2) array of the (x,y) positions of the cell centres, in row order
+
+    """
+
+    # number of ball positions for which the ball travel-time field is kept
+    max_ball_fields = 64
+
+    def __init__(self, field_dimen, n_grid_cells_x, n_grid_cells_y=None):
+        if n_grid_cells_y is None:
+            n_grid_cells_y = int(n_grid_cells_x * field_dimen[1] / field_dimen[0])
+        self.field_dimen = tuple(field_dimen)
+        self.n_grid_cells_x = n_grid_cells_x
+        self.n_grid_cells_y = n_grid_cells_y
+        self.shape = (n_grid_cells_y, n_grid_cells_x)
+        self.dx = field_dimen[0] / n_grid_cells_x
+        self.dy = field_dimen[1] / n_grid_cells_y
+        self.xgrid = (
+            np.arange(n_grid_cells_x) * self.dx - field_dimen[0] / 2.0 + self.dx / 2.0
+        )
+        self.ygrid = (
+            np.arange(n_grid_cells_y) * self.dy - field_dimen[1] / 2.0 + self.dy / 2.0
+        )
+        xx, yy = np.meshgrid(self.xgrid, self.ygrid)
+        self.target_positions = np.column_stack((xx.ravel(), yy.ravel()))
+        # the arrays are shared by everyone using the grid, so make sure they cannot be changed
+        for array in (self.xgrid, self.ygrid, self.target_positions):
+            array.flags.writeable = False
+        self._ball_fields = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __getstate__(self):
+        # the lock cannot be pickled, and the ball travel-time fields are cheap to rebuild
+        state = dict(self.__dict__)
+        del state["_lock"]
+        state["_ball_fields"] = OrderedDict()
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def ball_travel_time(self, ball_start_pos, params):
+        """
+        ball_travel_time(ball_start_pos, params)
+
+        Returns the ball travel time from ball_start_pos to every cell centre, as a read-only (n_grid_cells_y*n_grid_cells_x,)
+        array in the floating point type given by params['dtype']. The fields of the most recently used ball positions
+        are cached.
+
+        """
+        dtype = _dtype(params)
+        if ball_start_pos is None:
+            ball_key = None
+        else:
+            ball_key = tuple(np.asarray(ball_start_pos, dtype=float).tolist())
+        key = (ball_key, float(params["average_ball_speed"]), dtype.str)
+        # grids are shared between threads, so the store of fields is only changed while holding the lock
+        with self._lock:
+            field = self._ball_fields.get(key)
+            if field is not None:
+                self._ball_fields.move_to_end(key)
+                return field
+        field = _ball_travel_time(self.target_positions, ball_start_pos, params)
+        field.flags.writeable = False
+        with self._lock:
+            self._ball_fields[key] = field
+            if len(self._ball_fields) > self.max_ball_fields:
+                self._ball_fields.popitem(last=False)
+        return field
+
+    def cell_index(self, position):
+        """
+        cell_index(position)
+
+        Returns the (row, column) indices (iy, ix) of the cell containing an (x,y) position on the pitch, or arrays of
+        indices for a (N,2) array of positions.
+
+        """
+        position = np.asarray(position, dtype=float)
+        ix = (
+            (position[..., 0] + self.field_dimen[0] / 2.0 - 0.0001) / self.dx
+        ).astype(int)
+        iy = (
+            (position[..., 1] + self.field_dimen[1] / 2.0 - 0.0001) / self.dy
+        ).astype(int)
+        if position.ndim == 1:
+            return int(iy), int(ix)
+        return iy, ix
 
 
 def generate_pitch_control_for_event(
@@ -280,6 +784,11 @@ def generate_pitch_control_for_event(
     field_dimen=(106.0, 68.0,),
     n_grid_cells_x=50,
     offsides=True,
+    vectorized=True,
+    return_player_contributions=False,
+    max_bytes=None,
+    cache=None,
+    return_diagnostics=False,
 ):
     """ generate_pitch_control_for_event
 
@@ -297,6 +806,18 @@ def generate_pitch_control_for_event(
         n_grid_cells_x: Number of pixels in the grid (in the x-direction) that covers the surface. Default is 50.
                         n_grid_cells_y will be calculated based on n_grid_cells_x and the field dimensions
         offsides: If True, find and remove offside atacking players from the calculation. Default is True.
+        vectorized: If True (default), evaluate the whole surface in one call to calculate_pitch_control_surface().
+                    If False, loop over the grid and call calculate_pitch_control_at_target() at each cell.
+        return_player_contributions: If True, also return the pitch control surface of each individual player, from
+                    the same evaluation (requires vectorized=True). Default is False.
+        max_bytes: Approximate memory budget for the vectorized engine (see calculate_pitch_control_surface). Default is None.
+        cache: A Metrica_Cache.PitchControlCache. If given, the result is looked up in (and stored to) the cache, keyed
+               by the frame, team in possession, ball position, tracking data at the frame, model parameters, grid and
+               offside setting (see event_cache_key). The surfaces of both teams are stored, and those of each player
+               if return_player_contributions is True (a later request for them adds them to the entry). Default is
+               None (no caching).
+        return_diagnostics: If True, also return a dictionary describing the work done at each cell (requires
+                    vectorized=True). Default is False.
 
     UPDATE (tutorial 4): Note new input arguments ('GK_numbers' and 'offsides')
 
@@ -306,8 +827,24 @@ def generate_pitch_control_for_event(
                Surface for the defending team is just 1-PPCFa.
         xgrid: Positions of the pixels in the x-direction (field length)
         ygrid: Positions of the pixels in the y-direction (field width)
+        PPCF_players: (only if return_player_contributions is True) Pitch control surface of each player
+               (dimen (players,n_grid_cells_y,n_grid_cells_x) ), attacking players first. The surfaces of the players
+               of each team sum to that team's surface.
+        player_names: (only if return_player_contributions is True) list of the players in PPCF_players, as
+               "team_id" strings (e.g. "Home_5")
+        diagnostics: (only if return_diagnostics is True) Dictionary with the integration step count ('n_steps'), the
+               cells decided by the short-cut ('shortcut') and the cells that failed to converge ('failed'), each of
+               dimen (n_grid_cells_y,n_grid_cells_x), the players left out by the 'time_to_control' filter at each
+               cell ('pruned', dimen (players,n_grid_cells_y,n_grid_cells_x) ) and their names ('player_names').
+               See calculate_pitch_control_surface.
 
     """
+    assert (
+        vectorized or not return_player_contributions
+    ), "Player contributions are only available from the vectorized engine"
+    assert (
+        vectorized or not return_diagnostics
+    ), "Diagnostics are only available from the vectorized engine"
     # get the details of the event (frame, team in possession, ball_start_position)
     pass_frame = events.loc[event_id]["Start Frame"]
     pass_team = events.loc[event_id].Team
@@ -315,27 +852,51 @@ def generate_pitch_control_for_event(
         [events.loc[event_id]["Start X"], events.loc[event_id]["Start Y"]]
     )
     # break the pitch down into a grid
-    n_grid_cells_y = int(n_grid_cells_x * field_dimen[1] / field_dimen[0])
-    dx = field_dimen[0] / n_grid_cells_x
-    dy = field_dimen[1] / n_grid_cells_y
-    xgrid = np.arange(n_grid_cells_x) * dx - field_dimen[0] / 2.0 + dx / 2.0
-    ygrid = np.arange(n_grid_cells_y) * dy - field_dimen[1] / 2.0 + dy / 2.0
+    grid = get_pitch_grid(field_dimen, n_grid_cells_x)
+    xgrid, ygrid, target_positions = grid.xgrid, grid.ygrid, grid.target_positions
+    if cache is not None:
+        key = event_cache_key(
+            cache,
+            event_id,
+            events,
+            tracking_home,
+            tracking_away,
+            params,
+            GK_numbers,
+            field_dimen=field_dimen,
+            n_grid_cells_x=n_grid_cells_x,
+            offsides=offsides,
+            vectorized=vectorized,
+            return_diagnostics=return_diagnostics,
+        )
+        entry = cache.get(key)
+        # an entry stored without the player surfaces can't answer a request for them: the event is then evaluated
+        # again, and the entry replaced by one that holds them too
+        if entry is not None and (
+            not return_player_contributions or "PPCF_players" in entry
+        ):
+            return _event_result(
+                entry, xgrid, ygrid, return_player_contributions, return_diagnostics
+            )
+    n_grid_cells_y = len(ygrid)
     # initialise pitch control grids for attacking and defending teams
-    PPCFa = np.zeros(shape=(len(ygrid), len(xgrid)))
-    PPCFd = np.zeros(shape=(len(ygrid), len(xgrid)))
+    dtype = _dtype(params) if vectorized else float
+    PPCFa = np.zeros(shape=(len(ygrid), len(xgrid)), dtype=dtype)
+    PPCFd = np.zeros(shape=(len(ygrid), len(xgrid)), dtype=dtype)
     # initialise player positions and velocities for pitch control calc (so that we're not repeating this at each grid cell position)
+    initialise = initialise_team_state if vectorized else initialise_players
     if pass_team == "Home":
-        attacking_players = initialise_players(
+        attacking_players = initialise(
             tracking_home.loc[pass_frame], "Home", params, GK_numbers[0]
         )
-        defending_players = initialise_players(
+        defending_players = initialise(
             tracking_away.loc[pass_frame], "Away", params, GK_numbers[1]
         )
     elif pass_team == "Away":
-        defending_players = initialise_players(
+        defending_players = initialise(
             tracking_home.loc[pass_frame], "Home", params, GK_numbers[0]
         )
-        attacking_players = initialise_players(
+        attacking_players = initialise(
             tracking_away.loc[pass_frame], "Away", params, GK_numbers[1]
         )
     else:
@@ -347,24 +908,620 @@ def generate_pitch_control_for_event(
             attacking_players, defending_players, ball_start_pos, GK_numbers
         )
     # calculate pitch pitch control model at each location on the pitch
-    for i in range(len(ygrid)):
-        for j in range(len(xgrid)):
-            target_position = np.array([xgrid[j], ygrid[i]])
-            PPCFa[i, j], PPCFd[i, j] = calculate_pitch_control_at_target(
-                target_position,
-                attacking_players,
-                defending_players,
-                ball_start_pos,
-                params,
-            )
+    if vectorized:
+        surfaces = calculate_pitch_control_surface(
+            target_positions,
+            attacking_players,
+            defending_players,
+            ball_start_pos,
+            params,
+            return_player_contributions=return_player_contributions,
+            max_bytes=max_bytes,
+            ball_travel_time=grid.ball_travel_time(ball_start_pos, params),
+            return_diagnostics=return_diagnostics,
+        )
+        PPCFa = surfaces[0].reshape(PPCFa.shape)
+        PPCFd = surfaces[1].reshape(PPCFd.shape)
+    else:
+        for i in range(len(ygrid)):
+            for j in range(len(xgrid)):
+                target_position = np.array([xgrid[j], ygrid[i]])
+                PPCFa[i, j], PPCFd[i, j] = calculate_pitch_control_at_target(
+                    target_position,
+                    attacking_players,
+                    defending_players,
+                    ball_start_pos,
+                    params,
+                )
     # check probabilitiy sums within convergence
     checksum = np.sum(PPCFa + PPCFd) / float(n_grid_cells_y * n_grid_cells_x)
     assert 1 - checksum < params["model_converge_tol"], "Checksum failed: %1.3f" % (
         1 - checksum
     )
+    entry = {"PPCFa": PPCFa, "PPCFd": PPCFd}
+    if return_player_contributions or return_diagnostics:
+        player_names = [
+            "%s_%s" % (team.teamname, pid)
+            for team in (attacking_players, defending_players)
+            for pid in team.player_ids
+        ]
+    if return_player_contributions:
+        entry["PPCF_players"] = surfaces[2].reshape(-1, len(ygrid), len(xgrid))
+        entry["player_names"] = player_names
+    if return_diagnostics:
+        diagnostics = {
+            k: v.reshape(v.shape[:-1] + (len(ygrid), len(xgrid)))
+            for k, v in surfaces[-1].items()
+        }
+        diagnostics["player_names"] = player_names
+        entry["diagnostics"] = diagnostics
+    if cache is not None:
+        cache.put(key, entry)
+    return _event_result(
+        entry, xgrid, ygrid, return_player_contributions, return_diagnostics
+    )
+
+
+def event_cache_key(
+    cache,
+    event_id,
+    events,
+    tracking_home,
+    tracking_away,
+    params,
+    GK_numbers,
+    field_dimen=(106.0, 68.0,),
+    n_grid_cells_x=50,
+    offsides=True,
+    vectorized=True,
+    return_diagnostics=False,
+):
+    """ event_cache_key
+
+    Returns the key under which generate_pitch_control_for_event() stores the pitch control of an event in a cache. It
+    is a fingerprint of the frame, team in possession, ball position, tracking data at the frame, goalkeepers, model
+    parameters, grid and offside setting. The entry stored under it is a dictionary holding the surfaces of the
+    attacking ('PPCFa') and defending ('PPCFd') teams, dimen (n_grid_cells_y,n_grid_cells_x), and (if they were asked
+    for) the surface of each player ('PPCF_players', dimen (players,n_grid_cells_y,n_grid_cells_x) ) with their names
+    ('player_names'), attacking players first. Other analyses of the event can look up (or store) the same entry.
+
+    Parameters
+    -----------
+        cache: A Metrica_Cache.PitchControlCache
+        See generate_pitch_control_for_event() for the other parameters.
+
+    Returrns
+    -----------
+        key: The cache key (a hex string)
+
+    """
+    pass_frame = events.loc[event_id]["Start Frame"]
+    return cache.make_key(
+        "generate_pitch_control_for_event",
+        pass_frame,
+        events.loc[event_id].Team,
+        np.array([events.loc[event_id]["Start X"], events.loc[event_id]["Start Y"]]),
+        tracking_home.loc[pass_frame],
+        tracking_away.loc[pass_frame],
+        tuple(str(gk) for gk in GK_numbers),
+        params,
+        tuple(float(d) for d in field_dimen),
+        int(n_grid_cells_x),
+        bool(offsides),
+        bool(vectorized),
+        bool(return_diagnostics),
+    )
+
+
+def _event_result(entry, xgrid, ygrid, return_player_contributions, return_diagnostics):
+    # the result of generate_pitch_control_for_event from its (cached) entry
+    result = (entry["PPCFa"], xgrid, ygrid)
+    if return_player_contributions:
+        result += (entry["PPCF_players"], entry["player_names"])
+    if return_diagnostics:
+        result += (entry["diagnostics"],)
+    return result
+
+
+def generate_pitch_control_for_frames(
+    frames,
+    tracking_home,
+    tracking_away,
+    attacking_team,
+    params,
+    GK_numbers,
+    ball_start_positions=None,
+    field_dimen=(106.0, 68.0,),
+    n_grid_cells_x=50,
+    offsides=True,
+    max_bytes=None,
+    out=None,
+    n_threads=None,
+):
+    """ generate_pitch_control_for_frames
+
+    Evaluates pitch control surfaces over the entire field for a list (or range) of tracking frames. The grid and the
+    player columns of the tracking DataFrames are set up once, and the positions and velocities of all players are pulled
+    out of the tracking data for all frames in a single step, rather than building new 'player' objects at each frame.
+
+    Parameters
+    -----------
+        frames: list, range or array of tracking frame numbers (index of the tracking DataFrames)
+        tracking_home: tracking DataFrame for the Home team
+        tracking_away: tracking DataFrame for the Away team
+        attacking_team: team in possession, "Home" or "Away". Either a single string for all frames or a sequence with one entry per frame
+        params: Dictionary of model parameters (default model parameters can be generated using default_model_params() )
+        GK_numbers: tuple containing the player id of the goalkeepers for the (home team, away team)
+        ball_start_positions: (frames,2) array of ball positions. Default is None, in which case the ball position in the tracking data is used.
+        field_dimen: tuple containing the length and width of the pitch in meters. Default is (106,68)
+        n_grid_cells_x: Number of pixels in the grid (in the x-direction) that covers the surface. Default is 50.
+                        n_grid_cells_y will be calculated based on n_grid_cells_x and the field dimensions
+        offsides: If True, find and remove offside atacking players from the calculation. Default is True.
+        max_bytes: Approximate memory budget (in bytes). If set, the tracking data are pulled out in chunks of frames,
+                   and each surface is evaluated in tiles of targets (see calculate_pitch_control_surface), so that the
+                   working memory stays within the budget. Default is None.
+        out: Preallocated array (dimen (frames,n_grid_cells_y,n_grid_cells_x) ) into which the surfaces are written, e.g.
+             a numpy memmap for batches that are too large to hold in memory. Default is None (a new array is allocated).
+        n_threads: Number of threads evaluating the frames of each chunk at once. The pitch control calculations keep
+                   no state outside each call, and NumPy releases the GIL in its array operations, so frames can be
+                   evaluated in parallel without the start-up and copying costs of processes. Default is None (no threads).
+
+    Returrns
+    -----------
+        PPCFa: Pitch control surfaces (dimen (frames,n_grid_cells_y,n_grid_cells_x) ) containing pitch control probability for the attcking team.
+               Surfaces for the defending team are just 1-PPCFa.
+        xgrid: Positions of the pixels in the x-direction (field length)
+        ygrid: Positions of the pixels in the y-direction (field width)
+
+    """
+    frames = np.asarray(frames)
+    if isinstance(attacking_team, str):
+        attacking_team = [attacking_team] * len(frames)
+    assert len(attacking_team) == len(
+        frames
+    ), "attacking_team must be a single team name or have one entry per frame"
+    # break the pitch down into a grid
+    grid = get_pitch_grid(field_dimen, n_grid_cells_x)
+    xgrid, ygrid, target_positions = grid.xgrid, grid.ygrid, grid.target_positions
+    team_columns = {
+        "Home": get_team_columns(tracking_home, "Home"),
+        "Away": get_team_columns(tracking_away, "Away"),
+    }
+    if ball_start_positions is not None:
+        ball_start_positions = np.asarray(ball_start_positions, dtype=float)
+    # initialise pitch control grids for the attacking team
+    if out is None:
+        PPCFa = np.zeros(
+            shape=(len(frames), len(ygrid), len(xgrid)), dtype=_dtype(params)
+        )
+    else:
+        PPCFa = out
+        assert PPCFa.shape == (
+            len(frames),
+            len(ygrid),
+            len(xgrid),
+        ), "out must have dimen (frames,n_grid_cells_y,n_grid_cells_x)"
+    # frames are processed in chunks, with the tracking data for each chunk pulled out in one step
+    if max_bytes is None:
+        chunk_size = max(len(frames), 1)
+    else:
+        bytes_per_frame = 8 * (
+            4 * sum(len(ids) for ids, _ in team_columns.values()) + 2
+        )
+        chunk_size = max(int(max_bytes // (2 * bytes_per_frame)), 1)
+    # frames are evaluated one at a time, or by a pool of threads (nullcontext() gives executor=None)
+    with (
+        ThreadPoolExecutor(n_threads) if n_threads else contextlib.nullcontext()
+    ) as executor:
+        for start in range(0, len(frames), chunk_size):
+            chunk = frames[start : start + chunk_size]
+            # positions & velocities of all players for the frames in the chunk: dimen (frames, players, [x,y,vx,vy])
+            teams = {}
+            for teamname, tracking, GKid in (
+                ("Home", tracking_home, GK_numbers[0]),
+                ("Away", tracking_away, GK_numbers[1]),
+            ):
+                player_ids, columns = team_columns[teamname]
+                block = tracking.loc[chunk, columns].to_numpy(dtype=float)
+                teams[teamname] = (
+                    block.reshape(len(chunk), len(player_ids), 4),
+                    player_ids,
+                    GKid,
+                    teamname,
+                )
+            if ball_start_positions is None:
+                ball_positions = tracking_home.loc[
+                    chunk, ["ball_x", "ball_y"]
+                ].to_numpy(dtype=float)
+            else:
+                ball_positions = ball_start_positions[start : start + chunk_size]
+
+            def evaluate_frame(i):
+                # evaluate frame i of the chunk (only local state, so frames can be evaluated by several threads at once)
+                f = start + i
+                if attacking_team[f] == "Home":
+                    attacking, defending = teams["Home"], teams["Away"]
+                elif attacking_team[f] == "Away":
+                    attacking, defending = teams["Away"], teams["Home"]
+                else:
+                    assert False, "Team in possession must be either home or away"
+                attacking_players = TeamState.from_array(
+                    attacking[0][i], attacking[1], attacking[3], params, attacking[2]
+                )
+                defending_players = TeamState.from_array(
+                    defending[0][i], defending[1], defending[3], params, defending[2]
+                )
+                # find any attacking players that are offside and remove them from the pitch control calculation
+                if offsides:
+                    attacking_players = check_offsides(
+                        attacking_players,
+                        defending_players,
+                        ball_positions[i],
+                        GK_numbers,
+                    )
+                PPCFatt, PPCFdef = calculate_pitch_control_surface(
+                    target_positions,
+                    attacking_players,
+                    defending_players,
+                    ball_positions[i],
+                    params,
+                    max_bytes=max_bytes,
+                    ball_travel_time=grid.ball_travel_time(ball_positions[i], params),
+                )
+                # check probabilitiy sums within convergence
+                checksum = np.mean(PPCFatt + PPCFdef)
+                assert (
+                    1 - checksum < params["model_converge_tol"]
+                ), "Checksum failed: %1.3f" % (1 - checksum)
+                PPCFa[f] = PPCFatt.reshape(len(ygrid), len(xgrid))
+
+            if executor is None:
+                for i in range(len(chunk)):
+                    evaluate_frame(i)
+            else:
+                # list() waits for all the frames of the chunk (and raises any error from them)
+                list(executor.map(evaluate_frame, range(len(chunk))))
     return PPCFa, xgrid, ygrid
 
 
+def generate_interpolated_pitch_control_for_frames(
+    frames,
+    tracking_home,
+    tracking_away,
+    attacking_team,
+    params,
+    GK_numbers,
+    ball_start_positions=None,
+    field_dimen=(106.0, 68.0,),
+    n_grid_cells_x=50,
+    offsides=True,
+    keyframe_interval=5,
+    max_displacement=1.0,
+    interp_tol=0.02,
+    n_validation_frames=10,
+    max_bytes=None,
+):
+    """ generate_interpolated_pitch_control_for_frames
+
+    Evaluates pitch control surfaces for a dense sequence of tracking frames (e.g. every frame of a passage of play) by
+    computing exact surfaces only at 'key' frames and interpolating linearly (in time) between them. Key frames are:
+        - every 'keyframe_interval' frames, and the first and last frames
+        - the frames either side of a change in the team in possession (surfaces are never interpolated across one)
+        - extra frames wherever a player or the ball moves more than 'max_displacement' meters between key frames
+        - extra frames wherever the estimated interpolation error exceeds 'interp_tol'. The error between two key
+          frames is estimated from the second differences of the surfaces at the neighbouring key frames
+          ( h^2/8 * max|d^2 PPCF / dt^2| ), and a segment that fails is split in two until it passes.
+    The error actually achieved is then measured by computing the exact surface at a sample of the interpolated frames.
+
+    Parameters
+    -----------
+        frames: list, range or array of consecutive tracking frame numbers (index of the tracking DataFrames)
+        tracking_home: tracking DataFrame for the Home team
+        tracking_away: tracking DataFrame for the Away team
+        attacking_team: team in possession, "Home" or "Away". Either a single string for all frames or a sequence with one entry per frame
+        params: Dictionary of model parameters (default model parameters can be generated using default_model_params() )
+        GK_numbers: tuple containing the player id of the goalkeepers for the (home team, away team)
+        ball_start_positions: (frames,2) array of ball positions. Default is None, in which case the ball position in the tracking data is used.
+        field_dimen: tuple containing the length and width of the pitch in meters. Default is (106,68)
+        n_grid_cells_x: Number of pixels in the grid (in the x-direction) that covers the surface. Default is 50.
+        offsides: If True, find and remove offside atacking players from the calculation. Default is True.
+        keyframe_interval: Largest number of frames between key frames. Default is 5 (0.2s at 25Hz).
+        max_displacement: Largest distance (in meters) that any player or the ball can move between key frames. Default is 1.
+        interp_tol: Largest estimated interpolation error (in pitch control probability) between key frames. Default is 0.02.
+        n_validation_frames: Number of interpolated frames at which the exact surface is computed to measure the error
+                             achieved. Default is 10.
+        max_bytes: Approximate memory budget (see generate_pitch_control_for_frames). Default is None.
+
+    Returrns
+    -----------
+        PPCFa: Pitch control surfaces (dimen (frames,n_grid_cells_y,n_grid_cells_x) ) containing pitch control probability for the attcking team.
+        xgrid: Positions of the pixels in the x-direction (field length)
+        ygrid: Positions of the pixels in the y-direction (field width)
+        report: Dictionary describing the interpolation: 'exact' (boolean array, True at the key frames), 'n_exact' and
+                'n_interpolated' (numbers of frames), 'estimated_max_error' (largest estimated error between key
+                frames), and 'max_error' and 'mean_error' (largest and mean absolute error measured at the validation
+                frames; None if there were none)
+
+    """
+    frames = np.asarray(frames)
+    n_frames = len(frames)
+    if isinstance(attacking_team, str):
+        attacking_team = [attacking_team] * n_frames
+    attacking_team = np.asarray(attacking_team)
+    assert (
+        len(attacking_team) == n_frames
+    ), "attacking_team must be a single team name or have one entry per frame"
+    assert keyframe_interval >= 1, "keyframe_interval must be at least 1"
+    if ball_start_positions is None:
+        ball_start_positions = tracking_home.loc[frames, ["ball_x", "ball_y"]].to_numpy(
+            dtype=float
+        )
+    ball_start_positions = np.asarray(ball_start_positions, dtype=float)
+    xgrid, ygrid, _ = generate_pitch_grid(field_dimen, n_grid_cells_x)
+    PPCFa = np.zeros((n_frames, len(ygrid), len(xgrid)), dtype=_dtype(params))
+    exact = np.zeros(n_frames, dtype=bool)
+
+    def exact_surfaces(rows):
+        # exact surfaces at the given rows (positions in 'frames'), evaluated in batches of frames
+        surfaces = np.empty((len(rows),) + PPCFa.shape[1:], dtype=PPCFa.dtype)
+        for start in range(0, len(rows), 256):
+            batch = rows[start : start + 256]
+            surfaces[start : start + len(batch)] = generate_pitch_control_for_frames(
+                frames[batch],
+                tracking_home,
+                tracking_away,
+                attacking_team[batch],
+                params,
+                GK_numbers,
+                ball_start_positions=ball_start_positions[batch],
+                field_dimen=field_dimen,
+                n_grid_cells_x=n_grid_cells_x,
+                offsides=offsides,
+                max_bytes=max_bytes,
+            )[0]
+        return surfaces
+
+    # positions of all players and the ball at every frame: dimen (frames, players + ball, 2)
+    positions = []
+    for tracking, teamname in ((tracking_home, "Home"), (tracking_away, "Away")):
+        _, columns = get_team_columns(tracking, teamname)
+        columns = [c for c in columns if c[-2:] in ("_x", "_y")]
+        positions.append(tracking.loc[frames, columns].to_numpy(dtype=float))
+    positions = np.hstack(positions + [ball_start_positions]).reshape(n_frames, -1, 2)
+    # initial key frames: regular intervals, the ends, and either side of each change of possession
+    keys = np.zeros(n_frames, dtype=bool)
+    keys[::keyframe_interval] = True
+    keys[-1:] = True
+    change = np.flatnonzero(attacking_team[1:] != attacking_team[:-1])
+    keys[change] = True
+    keys[change + 1] = True
+    # split the segments between key frames in which a player or the ball moves too far
+    key_rows = np.flatnonzero(keys)
+    segments = list(zip(key_rows[:-1], key_rows[1:]))
+    while segments:
+        split = [
+            (a, b)
+            for a, b in segments
+            if b - a > 1 and _max_displacement(positions[a : b + 1]) > max_displacement
+        ]
+        segments = []
+        for a, b in split:
+            keys[(a + b) // 2] = True
+            segments += [(a, (a + b) // 2), ((a + b) // 2, b)]
+    rows = np.flatnonzero(keys)
+    PPCFa[rows] = exact_surfaces(rows)
+    exact[rows] = True
+    # split the segments with a large interpolation error estimate, until they all pass
+    while True:
+        key_rows = np.flatnonzero(keys)
+        errors = _interpolation_error_estimates(PPCFa, key_rows, attacking_team)
+        refine = (np.diff(key_rows) > 1) & ~(errors <= interp_tol)
+        if not np.any(refine):
+            break
+        rows = (key_rows[:-1][refine] + key_rows[1:][refine]) // 2
+        PPCFa[rows] = exact_surfaces(rows)
+        exact[rows] = True
+        keys[rows] = True
+    # linear interpolation between key frames
+    for a, b in zip(key_rows[:-1], key_rows[1:]):
+        if b - a > 1:
+            w = ((np.arange(a + 1, b) - a) / float(b - a))[:, None, None]
+            PPCFa[a + 1 : b] = (1 - w) * PPCFa[a] + w * PPCFa[b]
+    interpolated_segments = np.diff(key_rows) > 1
+    report = {
+        "exact": exact,
+        "n_exact": int(np.count_nonzero(exact)),
+        "n_interpolated": int(n_frames - np.count_nonzero(exact)),
+        "estimated_max_error": float(np.max(errors[interpolated_segments], initial=0)),
+        "max_error": None,
+        "mean_error": None,
+    }
+    # measure the error achieved at a sample of the interpolated frames
+    interpolated = np.flatnonzero(~exact)
+    if n_validation_frames and interpolated.size:
+        rows = interpolated[
+            np.linspace(
+                0, interpolated.size - 1, min(n_validation_frames, interpolated.size)
+            ).astype(int)
+        ]
+        error = np.abs(exact_surfaces(np.unique(rows)) - PPCFa[np.unique(rows)])
+        report["max_error"] = float(error.max())
+        report["mean_error"] = float(error.mean())
+    return PPCFa, xgrid, ygrid, report
+
+
+def generate_adaptive_pitch_control_for_event(
+    event_id,
+    events,
+    tracking_home,
+    tracking_away,
+    params,
+    GK_numbers,
+    field_dimen=(106.0, 68.0,),
+    n_grid_cells_x=200,
+    coarse_cell_size=8,
+    refine_tol=0.05,
+    offsides=True,
+    resample=True,
+    max_bytes=None,
+):
+    """ generate_adaptive_pitch_control_for_event
+
+    Evaluates a pitch control surface at the moment of the given event on a fine grid, without evaluating the model at
+    every cell. The fine grid (as in generate_pitch_control_for_event) is first covered with square blocks of
+    'coarse_cell_size' cells, and pitch control is evaluated at the corners of each block. A block is split into four
+    (quadtree refinement) if its corner values differ by more than 'refine_tol', if they straddle 0.5 (the boundary
+    between the regions controlled by each team), or if a player or the ball is inside it. Blocks that are not split
+    are filled in by bilinear interpolation of their corners. Refinement stops at single cells, which are exact.
+
+    Parameters
+    -----------
+        event_id: Index (not row) of the event that describes the instant at which the pitch control surface should be calculated
+        events: Dataframe containing the event data
+        tracking_home: tracking DataFrame for the Home team
+        tracking_away: tracking DataFrame for the Away team
+        params: Dictionary of model parameters (default model parameters can be generated using default_model_params() )
+        GK_numbers: tuple containing the player id of the goalkeepers for the (home team, away team)
+        field_dimen: tuple containing the length and width of the pitch in meters. Default is (106,68)
+        n_grid_cells_x: Number of pixels in the (fine) grid in the x-direction. Default is 200 (~0.5m cells)
+        coarse_cell_size: Size (in fine cells) of the blocks of the starting grid. Must be a power of 2. Default is 8.
+        refine_tol: Maximum difference between the corner values of a block for it to be interpolated. Default is 0.05.
+        offsides: If True, find and remove offside atacking players from the calculation. Default is True.
+        resample: If True (default), return the surface on the fine grid. If False, return the points at which the
+                  model was evaluated, and their values.
+        max_bytes: Approximate memory budget for the vectorized engine (see calculate_pitch_control_surface). Default is None.
+
+    Returrns
+    -----------
+        if resample is True:
+            PPCFa: Pitch control surface (dimen (n_grid_cells_y,n_grid_cells_x) ) containing pitch control probability for the attcking team.
+            xgrid: Positions of the pixels in the x-direction (field length)
+            ygrid: Positions of the pixels in the y-direction (field width)
+        if resample is False:
+            target_positions: (M,2) array of the positions at which pitch control was evaluated
+            PPCFatt: (M,) array of pitch control probabilities for the attacking team at those positions
+
+    """
+    assert coarse_cell_size >= 1 and not (
+        coarse_cell_size & (coarse_cell_size - 1)
+    ), "coarse_cell_size must be a power of 2"
+    # get the details of the event (frame, team in possession, ball_start_position)
+    pass_frame = events.loc[event_id]["Start Frame"]
+    pass_team = events.loc[event_id].Team
+    ball_start_pos = np.array(
+        [events.loc[event_id]["Start X"], events.loc[event_id]["Start Y"]]
+    )
+    assert pass_team in (
+        "Home",
+        "Away",
+    ), "Team in possession must be either home or away"
+    home_players = initialise_team_state(
+        tracking_home.loc[pass_frame], "Home", params, GK_numbers[0]
+    )
+    away_players = initialise_team_state(
+        tracking_away.loc[pass_frame], "Away", params, GK_numbers[1]
+    )
+    if pass_team == "Home":
+        attacking_players, defending_players = home_players, away_players
+    else:
+        attacking_players, defending_players = away_players, home_players
+    # find any attacking players that are offside and remove them from the pitch control calculation
+    if offsides:
+        attacking_players = check_offsides(
+            attacking_players, defending_players, ball_start_pos, GK_numbers
+        )
+    # fine grid. PPCFa is filled in as cells are evaluated ('exact') or interpolated
+    xgrid, ygrid, _ = generate_pitch_grid(field_dimen, n_grid_cells_x)
+    ny, nx = len(ygrid), len(xgrid)
+    PPCFa = np.zeros((ny, nx), dtype=_dtype(params))
+    exact = np.zeros((ny, nx), dtype=bool)
+    # fine-grid cells containing a player or the ball (their blocks are always refined)
+    positions = np.vstack(
+        (attacking_players.position, defending_players.position, ball_start_pos)
+    )
+    positions = positions[~np.any(np.isnan(positions), axis=1)]
+    occupied = np.zeros((ny + 1, nx + 1))
+    occupied[
+        np.clip(np.searchsorted(ygrid, positions[:, 1]), 0, ny - 1) + 1,
+        np.clip(np.searchsorted(xgrid, positions[:, 0]), 0, nx - 1) + 1,
+    ] = 1
+    # summed-area table, so the number of occupied cells in any block is found with four lookups
+    occupied = occupied.cumsum(axis=0).cumsum(axis=1)
+
+    def evaluate(iy, ix):
+        # evaluate the model at the cells (iy, ix) that have not been evaluated yet
+        cells = np.unique(iy * nx + ix)
+        iy, ix = np.divmod(cells[~exact.ravel()[cells]], nx)
+        if iy.size:
+            PPCFa[iy, ix], _ = calculate_pitch_control_surface(
+                np.column_stack((xgrid[ix], ygrid[iy])),
+                attacking_players,
+                defending_players,
+                ball_start_pos,
+                params,
+                max_bytes=max_bytes,
+            )
+            exact[iy, ix] = True
+
+    # blocks are given by the fine-grid indices of their lower-left corner, and their size
+    size = coarse_cell_size
+    i0, j0 = np.meshgrid(
+        np.arange(0, max(ny - 1, 1), size), np.arange(0, max(nx - 1, 1), size)
+    )
+    i0, j0 = i0.ravel(), j0.ravel()
+    while i0.size:
+        i1 = np.minimum(i0 + size, ny - 1)
+        j1 = np.minimum(j0 + size, nx - 1)
+        evaluate(
+            np.concatenate((i0, i0, i1, i1)).astype(int),
+            np.concatenate((j0, j1, j0, j1)).astype(int),
+        )
+        corners = np.stack(
+            (PPCFa[i0, j0], PPCFa[i0, j1], PPCFa[i1, j0], PPCFa[i1, j1])
+        )
+        refine = (corners.max(axis=0) - corners.min(axis=0) > refine_tol) | (
+            (corners.min(axis=0) < 0.5) & (corners.max(axis=0) > 0.5)
+        )
+        refine |= (
+            occupied[i1 + 1, j1 + 1]
+            - occupied[i0, j1 + 1]
+            - occupied[i1 + 1, j0]
+            + occupied[i0, j0]
+        ) > 0
+        # blocks with a single cell have nothing left to refine
+        refine &= size > 1
+        # fill in the blocks that are not refined by bilinear interpolation of their corners (blocks at the edges of
+        # the pitch may be smaller, so the blocks are grouped by shape)
+        keep = ~refine
+        for h, w in set(zip(i1[keep] - i0[keep], j1[keep] - j0[keep])):
+            k = np.flatnonzero(keep & (i1 - i0 == h) & (j1 - j0 == w))
+            wy = (np.arange(h + 1) / max(h, 1))[None, :, None]
+            wx = (np.arange(w + 1) / max(w, 1))[None, None, :]
+            c = corners[:, k, None, None]
+            block = (
+                (1 - wy) * (1 - wx) * c[0]
+                + (1 - wy) * wx * c[1]
+                + wy * (1 - wx) * c[2]
+                + wy * wx * c[3]
+            )
+            rows = (i0[k, None] + np.arange(h + 1))[:, :, None]
+            cols = (j0[k, None] + np.arange(w + 1))[:, None, :]
+            PPCFa[rows, cols] = np.where(exact[rows, cols], PPCFa[rows, cols], block)
+        # split the refined blocks into four
+        size //= 2
+        i0, j0 = i0[refine], j0[refine]
+        i0, j0 = (
+            np.concatenate((i0, i0 + size, i0, i0 + size)),
+            np.concatenate((j0, j0, j0 + size, j0 + size)),
+        )
+        inside = (i0 < max(ny - 1, 1)) & (j0 < max(nx - 1, 1))
+        i0, j0 = i0[inside], j0[inside]
+    if resample:
+        return PPCFa, xgrid, ygrid
+    iy, ix = np.nonzero(exact)
+    return np.column_stack((xgrid[ix], ygrid[iy])), PPCFa[iy, ix]
+
+
 def calculate_pitch_control_at_target(
     target_position, attacking_players, defending_players, ball_start_pos, params
 ):
@@ -385,7 +1542,16 @@ def calculate_pitch_control_at_target(
         PPCFatt: Pitch control probability for the attacking team
         PPCFdef: Pitch control probability for the defending team ( 1-PPCFatt-PPCFdef <  params['model_converge_tol'] )
 
+    attacking_players and defending_players can also be given as TeamState objects.
+
     """
+    if isinstance(attacking_players, TeamState) or isinstance(
+        defending_players, TeamState
+    ):
+        PPCFatt, PPCFdef = calculate_pitch_control_surface(
+            target_position, attacking_players, defending_players, ball_start_pos, params
+        )
+        return PPCFatt[0], PPCFdef[0]
     # calculate ball travel time from start position to end position.
     if ball_start_pos is None or any(
         np.isnan(ball_start_pos)
@@ -399,12 +1565,17 @@ def calculate_pitch_control_at_target(
         )
 
     # first get arrival time of 'nearest' attacking player (nearest also dependent on current velocity)
-    tau_min_att = np.nanmin(
-        [p.simple_time_to_intercept(target_position) for p in attacking_players]
+    # (arrival times and player contributions are kept here rather than on the player objects, so that the same
+    # players can be used by several threads at once)
+    tti_model = params.get("tti_model", "simple")
+    tti_att = np.array(
+        [p.arrival_time(target_position, tti_model) for p in attacking_players]
     )
-    tau_min_def = np.nanmin(
-        [p.simple_time_to_intercept(target_position) for p in defending_players]
+    tti_def = np.array(
+        [p.arrival_time(target_position, tti_model) for p in defending_players]
     )
+    tau_min_att = np.nanmin(tti_att)
+    tau_min_def = np.nanmin(tti_def)
 
     # check whether we actually need to solve equation 3
     if (
@@ -423,21 +1594,36 @@ def calculate_pitch_control_at_target(
         # solve pitch control model by integrating equation 3 in Spearman et al.
         # first remove any player that is far (in time) from the target location
         attacking_players = [
-            p
-            for p in attacking_players
-            if p.time_to_intercept - tau_min_att < params["time_to_control_att"]
+            (p, tti)
+            for p, tti in zip(attacking_players, tti_att)
+            if tti - tau_min_att < params["time_to_control_att"]
         ]
         defending_players = [
-            p
-            for p in defending_players
-            if p.time_to_intercept - tau_min_def < params["time_to_control_def"]
+            (p, tti)
+            for p, tti in zip(defending_players, tti_def)
+            if tti - tau_min_def < params["time_to_control_def"]
         ]
+        # total contribution from each individual player
+        PPCF_att = np.zeros(len(attacking_players))
+        PPCF_def = np.zeros(len(defending_players))
         # set up integration arrays
-        dT_array = np.arange(
-            ball_travel_time - params["int_dt"],
-            ball_travel_time + params["max_int_time"],
-            params["int_dt"],
-        )
+        integrator = params.get("integrator", "euler")
+        if integrator == "euler":
+            dt = params["int_dt"]
+            dT_array = np.arange(
+                ball_travel_time - dt, ball_travel_time + params["max_int_time"], dt
+            )
+        elif integrator == "exponential":
+            # step i covers [ball_travel_time + (i-1)*dt, ball_travel_time + i*dt], and the rates are taken at its
+            # midpoint (as in calculate_pitch_control_surface)
+            dt = params["exp_int_dt"]
+            dT_array = (
+                ball_travel_time
+                - dt / 2.0
+                + dt * np.arange(int(np.ceil(params["max_int_time"] / dt)) + 1)
+            )
+        else:
+            assert False, "integrator must be either 'euler' or 'exponential'"
         PPCFatt = np.zeros_like(dT_array)
         PPCFdef = np.zeros_like(dT_array)
         # integration equation 3 of Spearman 2018 until convergence or tolerance limit hit (see 'params')
@@ -445,44 +1631,791 @@ def calculate_pitch_control_at_target(
         i = 1
         while 1 - ptot > params["model_converge_tol"] and i < dT_array.size:
             T = dT_array[i]
-            for player in attacking_players:
+            # probability that each player has reached the ball by time T
+            f_att = [
+                player.probability_intercept_ball(T, tti)
+                for player, tti in attacking_players
+            ]
+            f_def = [
+                player.probability_intercept_ball(T, tti)
+                for player, tti in defending_players
+            ]
+            if integrator == "exponential":
+                # with the rates held fixed over the step, the probability that nobody has controlled the ball decays
+                # exponentially, so the step is (1-exp(-rate*dt))/rate rather than dt
+                rate = sum(
+                    f * player.lambda_att
+                    for f, (player, _) in zip(f_att, attacking_players)
+                ) + sum(
+                    f * player.lambda_def
+                    for f, (player, _) in zip(f_def, defending_players)
+                )
+                step = -np.expm1(-rate * dt) / rate if rate > 0 else dt
+            else:
+                step = dt
+            for k, (player, tti) in enumerate(attacking_players):
                 # calculate ball control probablity for 'player' in time interval T+dt
                 dPPCFdT = (
-                    (1 - PPCFatt[i - 1] - PPCFdef[i - 1])
-                    * player.probability_intercept_ball(T)
-                    * player.lambda_att
+                    (1 - PPCFatt[i - 1] - PPCFdef[i - 1]) * f_att[k] * player.lambda_att
                 )
                 # make sure it's greater than zero
                 assert (
                     dPPCFdT >= 0
                 ), "Invalid attacking player probability (calculate_pitch_control_at_target)"
-                player.PPCF += (
-                    dPPCFdT * params["int_dt"]
-                )  # total contribution from individual player
-                PPCFatt[
-                    i
-                ] += (
-                    player.PPCF
-                )  # add to sum over players in the attacking team (remembering array element is zero at the start of each integration iteration)
-            for player in defending_players:
+                PPCF_att[k] += dPPCFdT * step
+                # add to sum over players in the attacking team (remembering array element is zero at the start of each integration iteration)
+                PPCFatt[i] += PPCF_att[k]
+            for k, (player, tti) in enumerate(defending_players):
                 # calculate ball control probablity for 'player' in time interval T+dt
                 dPPCFdT = (
-                    (1 - PPCFatt[i - 1] - PPCFdef[i - 1])
-                    * player.probability_intercept_ball(T)
-                    * player.lambda_def
+                    (1 - PPCFatt[i - 1] - PPCFdef[i - 1]) * f_def[k] * player.lambda_def
                 )
                 # make sure it's greater than zero
                 assert (
                     dPPCFdT >= 0
                 ), "Invalid defending player probability (calculate_pitch_control_at_target)"
-                player.PPCF += (
-                    dPPCFdT * params["int_dt"]
-                )  # total contribution from individual player
-                PPCFdef[
-                    i
-                ] += player.PPCF  # add to sum over players in the defending team
+                PPCF_def[k] += dPPCFdT * step
+                # add to sum over players in the defending team
+                PPCFdef[i] += PPCF_def[k]
             ptot = PPCFdef[i] + PPCFatt[i]  # total pitch control probability
             i += 1
         if i >= dT_array.size:
             print("Integration failed to converge: %1.3f" % (ptot))
         return PPCFatt[i - 1], PPCFdef[i - 1]
+
+
+def calculate_pitch_control_at_targets(
+    target_positions,
+    attacking_players,
+    defending_players,
+    ball_start_pos,
+    params,
+    max_bytes=None,
+):
+    """ calculate_pitch_control_at_targets
+
+    Calculates the pitch control probability for the attacking and defending teams at many arbitrary target positions
+    (e.g. the start and end points of a pass, or a set of pass options) in one vectorized call. The team states are set
+    up once and shared by all the targets. Each target can have its own ball start position (e.g. passes from different
+    points); note that offside players are not re-evaluated for each ball position.
+
+    Parameters
+    -----------
+        target_positions: (N,2) numpy array (or a single (x,y) position) containing the positions on the field to evaluate pitch control
+        attacking_players: TeamState object, or list of 'player' objects, for the players on the attacking team (team in possession)
+        defending_players: TeamState object, or list of 'player' objects, for the players on the defending team
+        ball_start_pos: Current position of the ball (start position for a pass), either one (x,y) position for all targets
+                        or a (N,2) array with one position per target. Targets with a NaN ball position are evaluated
+                        as if the ball is already at the target position.
+        params: Dictionary of model parameters (default model parameters can be generated using default_model_params() )
+        max_bytes: Approximate memory budget (see calculate_pitch_control_surface). Default is None.
+
+    Returrns
+    -----------
+        PPCFatt: (N,) array of pitch control probabilities for the attacking team
+        PPCFdef: (N,) array of pitch control probabilities for the defending team
+
+    """
+    target_positions = np.asarray(target_positions, dtype=float).reshape(-1, 2)
+    if ball_start_pos is not None:
+        ball_start_pos = np.asarray(ball_start_pos, dtype=float)
+        assert ball_start_pos.shape in (
+            (2,),
+            target_positions.shape,
+        ), "ball_start_pos must be a single position or have one position per target"
+    return calculate_pitch_control_surface(
+        target_positions,
+        _as_team_state(attacking_players),
+        _as_team_state(defending_players),
+        ball_start_pos,
+        params,
+        max_bytes=max_bytes,
+    )
+
+
+def calculate_pitch_control_surface(
+    target_positions,
+    attacking_players,
+    defending_players,
+    ball_start_pos,
+    params,
+    return_player_contributions=False,
+    max_bytes=None,
+    ball_travel_time=None,
+    return_diagnostics=False,
+):
+    """ calculate_pitch_control_surface
+
+    Vectorized version of calculate_pitch_control_at_target(). Evaluates the pitch control probability for the attacking
+    and defending teams at every target position in a single call. Arrival times are computed for all (target, player)
+    pairs at once and used to find the targets that are decided by the 'time_to_control' short-cut. Equation 3 of
+    Spearman 2018 is then integrated only at the remaining (contested) targets, with the same explicit scheme as
+    calculate_pitch_control_at_target(), one time step at a time over (targets x players) arrays. Targets are dropped
+    from the integration once they converge.
+
+    Parameters
+    -----------
+        target_positions: (N,2) numpy array containing the (x,y) positions on the field at which to evaluate pitch control
+        attacking_players: TeamState object, or list of 'player' objects, for the players on the attacking team (team in possession)
+        defending_players: TeamState object, or list of 'player' objects, for the players on the defending team
+        ball_start_pos: Current position of the ball (start position for a pass), or a (N,2) array with one position per target. If set to NaN, function will assume that the ball is already at the target position.
+        params: Dictionary of model parameters (default model parameters can be generated using default_model_params() )
+        return_player_contributions: If True, also return the contribution of each player to the pitch control of their
+                                     team at each target. Default is False.
+        max_bytes: Approximate memory budget (in bytes) for the intermediate (targets x players) arrays. If set, the
+                   targets are evaluated in tiles small enough to stay within the budget, and the results are written
+                   into preallocated output arrays. Default is None (all targets in one tile).
+        ball_travel_time: (N,) array of precomputed ball travel times to the targets, e.g. PitchGrid.ball_travel_time()
+                          when the targets are the cells of a grid. Default is None (computed from ball_start_pos).
+        return_diagnostics: If True, also return a dictionary describing the work done at each target (see below).
+                            Default is False.
+
+    Returrns
+    -----------
+        PPCFatt: (N,) array of pitch control probabilities for the attacking team
+        PPCFdef: (N,) array of pitch control probabilities for the defending team ( 1-PPCFatt-PPCFdef <  params['model_converge_tol'] )
+        PPCF_players: (only if return_player_contributions is True) (players,N) array of the pitch control probability
+                      of each player at each target, attacking players first and then defending players (in TeamState
+                      order). At targets decided by the 'time_to_control' short-cut, the controlling team's probability
+                      is given to its first player to arrive.
+        diagnostics: (only if return_diagnostics is True) Dictionary of arrays describing the evaluation at each target:
+                     'n_steps': (N,) number of integration steps taken (0 at targets decided by the short-cut)
+                     'shortcut': (N,) True at targets decided by the 'time_to_control' short-cut
+                     'failed': (N,) True at targets where the integration hit 'max_int_time' before converging (if
+                               there are any, their number is also reported in a single RuntimeWarning)
+                     'pruned': (players,N) True where a player was left out of the integration because they arrive
+                               more than 'time_to_control' after the first player of their team (players in the same
+                               order as PPCF_players; always False at short-cut targets)
+                     These can be used to tune 'int_dt', 'max_int_time' and 'time_to_control_veto' for speed.
+
+    """
+    att = _as_team_state(attacking_players)
+    dfd = _as_team_state(defending_players)
+    target_positions = np.asarray(target_positions, dtype=float).reshape(-1, 2)
+    n_targets = len(target_positions)
+    tile_size = _tile_size(len(att) + len(dfd), max_bytes, _dtype(params).itemsize)
+    # ball start positions can be given per target, in which case they are tiled with the targets
+    ball_per_target = ball_start_pos is not None and np.ndim(ball_start_pos) == 2
+    if tile_size >= n_targets:
+        return _pitch_control_tile(
+            target_positions,
+            att,
+            dfd,
+            ball_start_pos,
+            params,
+            return_player_contributions,
+            ball_travel_time,
+            return_diagnostics,
+        )
+    # evaluate the targets in tiles, writing each tile into the preallocated results
+    dtype = _dtype(params)
+    n_players = len(att) + len(dfd)
+    results = [np.empty(n_targets, dtype=dtype), np.empty(n_targets, dtype=dtype)]
+    if return_player_contributions:
+        results.append(np.empty((n_players, n_targets), dtype=dtype))
+    if return_diagnostics:
+        results.append(
+            {
+                "n_steps": np.empty(n_targets, dtype=int),
+                "shortcut": np.empty(n_targets, dtype=bool),
+                "failed": np.empty(n_targets, dtype=bool),
+                "pruned": np.empty((n_players, n_targets), dtype=bool),
+            }
+        )
+    for start in range(0, n_targets, tile_size):
+        tile = slice(start, start + tile_size)
+        for result, tile_result in zip(
+            results,
+            _pitch_control_tile(
+                target_positions[tile],
+                att,
+                dfd,
+                ball_start_pos[tile] if ball_per_target else ball_start_pos,
+                params,
+                return_player_contributions,
+                None if ball_travel_time is None else ball_travel_time[tile],
+                return_diagnostics,
+            ),
+        ):
+            if isinstance(result, dict):
+                for k in result:
+                    result[k][..., tile] = tile_result[k]
+            else:
+                result[..., tile] = tile_result
+    return tuple(results)
+
+
+def _pitch_control_tile(
+    target_positions,
+    att,
+    dfd,
+    ball_start_pos,
+    params,
+    return_player_contributions,
+    ball_travel_time=None,
+    return_diagnostics=False,
+):
+    # calculate_pitch_control_surface() for a single tile of targets, held in memory all at once
+    # first stage: arrival times at all targets, and the targets that are decided by the 'time_to_control' short-cut
+    arrival_times = calculate_arrival_times(
+        target_positions, att, dfd, ball_start_pos, params, ball_travel_time
+    )
+    att_first, def_first = find_decided_targets(arrival_times, params)
+    PPCFatt = att_first.astype(_dtype(params))
+    PPCFdef = def_first.astype(_dtype(params))
+    # second stage: integrate equation 3 only at the contested targets
+    contested = np.flatnonzero(~(att_first | def_first))
+    (
+        PPCFatt[contested],
+        PPCFdef[contested],
+        PPCF_players_att,
+        PPCF_players_def,
+        stats,
+    ) = _integrate_pitch_control(
+        {k: v[contested] for k, v in arrival_times.items()}, att, dfd, params
+    )
+    results = (PPCFatt, PPCFdef)
+    if return_player_contributions:
+        # contribution of each player, with decided targets given to the first player to arrive
+        PPCF_players = np.zeros(
+            (len(att) + len(dfd), PPCFatt.size), dtype=PPCFatt.dtype
+        )
+        targets = np.flatnonzero(att_first)
+        PPCF_players[
+            np.nanargmin(arrival_times["tti_att"][targets], axis=1), targets
+        ] = 1.0
+        targets = np.flatnonzero(def_first)
+        PPCF_players[
+            len(att) + np.nanargmin(arrival_times["tti_def"][targets], axis=1), targets
+        ] = 1.0
+        PPCF_players[: len(att), contested] = PPCF_players_att.T
+        PPCF_players[len(att) :, contested] = PPCF_players_def.T
+        results += (PPCF_players,)
+    if return_diagnostics:
+        # players left out of the integration by the 'time_to_control' filter (as in _integrate_pitch_control)
+        pruned = np.zeros((len(att) + len(dfd), PPCFatt.size), dtype=bool)
+        pruned[: len(att), contested] = ~(
+            arrival_times["tti_att"][contested]
+            - arrival_times["tau_min_att"][contested, None]
+            < params["time_to_control_att"]
+        ).T
+        pruned[len(att) :, contested] = ~(
+            arrival_times["tti_def"][contested]
+            - arrival_times["tau_min_def"][contested, None]
+            < params["time_to_control_def"]
+        ).T
+        diagnostics = {
+            "n_steps": np.zeros(PPCFatt.size, dtype=int),
+            "shortcut": att_first | def_first,
+            "failed": np.zeros(PPCFatt.size, dtype=bool),
+            "pruned": pruned,
+        }
+        diagnostics["n_steps"][contested] = stats["n_steps"]
+        diagnostics["failed"][contested] = ~stats["converged"]
+        results += (diagnostics,)
+    return results
+
+
+def calculate_arrival_times(
+    target_positions,
+    attacking_players,
+    defending_players,
+    ball_start_pos,
+    params,
+    ball_travel_time=None,
+):
+    """ calculate_arrival_times
+
+    Calculates the ball travel time, and the arrival time of every player, at each target position.
+
+    Parameters
+    -----------
+        target_positions: (N,2) numpy array containing the (x,y) positions on the field
+        attacking_players: TeamState object, or list of 'player' objects, for the players on the attacking team (team in possession)
+        defending_players: TeamState object, or list of 'player' objects, for the players on the defending team
+        ball_start_pos: Current position of the ball (start position for a pass), or a (N,2) array with one position per target. If set to NaN, function will assume that the ball is already at the target position.
+        params: Dictionary of model parameters (default model parameters can be generated using default_model_params() )
+        ball_travel_time: (N,) array of precomputed ball travel times to the targets (e.g. from PitchGrid.ball_travel_time),
+                          in which case ball_start_pos is not used. Default is None.
+
+    Returrns
+    -----------
+        arrival_times: Dictionary of arrays with the ball travel time ('ball_travel_time', dimen (N,) ), the arrival times
+                       of each attacking and defending player ('tti_att', 'tti_def', dimen (N,players) ) and of the first
+                       player of each team ('tau_min_att', 'tau_min_def', dimen (N,) ) at each target
+
+    """
+    att = _as_team_state(attacking_players)
+    dfd = _as_team_state(defending_players)
+    dtype = _dtype(params)
+    target_positions = np.asarray(target_positions, dtype=dtype).reshape(-1, 2)
+    if ball_travel_time is None:
+        ball_travel_time = _ball_travel_time(target_positions, ball_start_pos, params)
+    else:
+        ball_travel_time = np.asarray(ball_travel_time, dtype=dtype)
+    tti_model = params.get("tti_model", "simple")
+    tti_att = _time_to_intercept(target_positions, att, tti_model)
+    tti_def = _time_to_intercept(target_positions, dfd, tti_model)
+    return {
+        "ball_travel_time": ball_travel_time,
+        "tti_att": tti_att,
+        "tti_def": tti_def,
+        "tau_min_att": np.nanmin(tti_att, axis=1),
+        "tau_min_def": np.nanmin(tti_def, axis=1),
+    }
+
+
+def find_decided_targets(arrival_times, params):
+    """ find_decided_targets
+
+    Finds the targets at which one team arrives at least 'time_to_control' seconds before the other, so that there is no
+    need to solve the pitch control model (the short-cut in calculate_pitch_control_at_target).
+
+    Parameters
+    -----------
+        arrival_times: Dictionary of arrival times at each target, as returned by calculate_arrival_times()
+        params: Dictionary of model parameters (default model parameters can be generated using default_model_params() )
+
+    Returrns
+    -----------
+        att_first: boolean array, True where the attacking team controls the ball (PPCFatt = 1)
+        def_first: boolean array, True where the defending team controls the ball (PPCFdef = 1)
+
+    """
+    ball_travel_time = arrival_times["ball_travel_time"]
+    tau_min_att = arrival_times["tau_min_att"]
+    tau_min_def = arrival_times["tau_min_def"]
+    # the defending team is checked first, as in calculate_pitch_control_at_target
+    def_first = (
+        tau_min_att - np.maximum(ball_travel_time, tau_min_def)
+        >= params["time_to_control_def"]
+    )
+    att_first = ~def_first & (
+        tau_min_def - np.maximum(ball_travel_time, tau_min_att)
+        >= params["time_to_control_att"]
+    )
+    return att_first, def_first
+
+
+def update_pitch_control_surface(
+    target_positions,
+    PPCFatt,
+    PPCFdef,
+    arrival_times,
+    attacking_players,
+    defending_players,
+    new_attacking_players,
+    new_defending_players,
+    ball_start_pos,
+    params,
+):
+    """ update_pitch_control_surface
+
+    Updates a pitch control surface after a change to a single player (new position and/or velocity, or a player
+    added/removed), without recomputing the whole surface. The changed player is found by comparing the old and new
+    team states. Only the targets at which the player's old or new arrival time is within 'time_to_control' of the
+    first arrival of their team are recomputed; at all other targets the player is ignored by the model both before
+    and after the change, so the pitch control is unchanged. If more than one player changed (e.g. a defender moved and
+    changed the offside line), the surface is recomputed from scratch.
+
+    Parameters
+    -----------
+        target_positions: (N,2) numpy array containing the (x,y) positions on the field
+        PPCFatt: (N,) array of the baseline pitch control probabilities for the attacking team
+        PPCFdef: (N,) array of the baseline pitch control probabilities for the defending team
+        arrival_times: Dictionary of baseline arrival times, as returned by calculate_arrival_times()
+        attacking_players: TeamState object for the attacking team used for the baseline (offside players removed)
+        defending_players: TeamState object for the defending team used for the baseline
+        new_attacking_players: TeamState object for the attacking team after the change (offside players removed)
+        new_defending_players: TeamState object for the defending team after the change
+        ball_start_pos: Current position of the ball (start position for a pass). Must be the same as for the baseline.
+        params: Dictionary of model parameters (default model parameters can be generated using default_model_params() )
+
+    Returrns
+    -----------
+        PPCFatt: (N,) array of updated pitch control probabilities for the attacking team
+        PPCFdef: (N,) array of updated pitch control probabilities for the defending team
+        arrival_times: Dictionary of updated arrival times (can be passed back in for the next update)
+
+    """
+    target_positions = np.asarray(target_positions, dtype=float).reshape(-1, 2)
+    changes = [
+        (side, pid)
+        for side, old, new in (
+            ("att", attacking_players, new_attacking_players),
+            ("def", defending_players, new_defending_players),
+        )
+        for pid in _changed_players(old, new)
+    ]
+    if len(changes) != 1:
+        # the ball has not moved, so its travel times are reused
+        arrival_times = calculate_arrival_times(
+            target_positions,
+            new_attacking_players,
+            new_defending_players,
+            ball_start_pos,
+            params,
+            ball_travel_time=arrival_times["ball_travel_time"],
+        )
+        PPCFatt, PPCFdef = calculate_pitch_control_surface(
+            target_positions,
+            new_attacking_players,
+            new_defending_players,
+            ball_start_pos,
+            params,
+            ball_travel_time=arrival_times["ball_travel_time"],
+        )
+        return PPCFatt, PPCFdef, arrival_times
+    side, pid = changes[0]
+    old, new = {
+        "att": (attacking_players, new_attacking_players),
+        "def": (defending_players, new_defending_players),
+    }[side]
+    time_to_control = params["time_to_control_" + side]
+    # arrival times for the new team: reuse the old columns for every player except the one that changed
+    old_column = dict(zip(old.player_ids, range(len(old))))
+    tti_old = arrival_times["tti_" + side]
+    tti_new = np.empty((target_positions.shape[0], len(new)), dtype=tti_old.dtype)
+    for j, new_id in enumerate(new.player_ids):
+        if new_id == pid:
+            tti_new[:, j] = _time_to_intercept(
+                target_positions.astype(tti_old.dtype),
+                new.subset([j]),
+                params.get("tti_model", "simple"),
+            )[:, 0]
+        else:
+            tti_new[:, j] = tti_old[:, old_column[new_id]]
+    arrival_times = dict(arrival_times)
+    arrival_times["tti_" + side] = tti_new
+    tau_min_old = arrival_times["tau_min_" + side]
+    arrival_times["tau_min_" + side] = np.nanmin(tti_new, axis=1)
+    # targets at which the changed player takes part in the model, before or after the change
+    recompute = np.zeros(target_positions.shape[0], dtype=bool)
+    if pid in old_column:
+        recompute |= tti_old[:, old_column[pid]] - tau_min_old < time_to_control
+    if pid in new.player_ids:
+        j = list(new.player_ids).index(pid)
+        recompute |= (
+            tti_new[:, j] - arrival_times["tau_min_" + side] < time_to_control
+        )
+    recompute = np.flatnonzero(recompute)
+    PPCFatt = np.array(PPCFatt, dtype=_dtype(params))
+    PPCFdef = np.array(PPCFdef, dtype=_dtype(params))
+    subset = {k: v[recompute] for k, v in arrival_times.items()}
+    att_first, def_first = find_decided_targets(subset, params)
+    contested = ~(att_first | def_first)
+    PPCFatt[recompute] = att_first
+    PPCFdef[recompute] = def_first
+    (
+        PPCFatt[recompute[contested]],
+        PPCFdef[recompute[contested]],
+        _,
+        _,
+        _,
+    ) = _integrate_pitch_control(
+        {k: v[contested] for k, v in subset.items()},
+        new_attacking_players,
+        new_defending_players,
+        params,
+    )
+    return PPCFatt, PPCFdef, arrival_times
+
+
+def _changed_players(old, new):
+    # ids of the players whose state differs between two TeamState objects (including players added or removed)
+    old_index = dict(zip(old.player_ids, range(len(old))))
+    new_index = dict(zip(new.player_ids, range(len(new))))
+    changed = set(old_index).symmetric_difference(new_index)
+    for pid in set(old_index).intersection(new_index):
+        i, j = old_index[pid], new_index[pid]
+        if any(
+            np.any(getattr(old, attr)[i] != getattr(new, attr)[j])
+            for attr in (
+                "position",
+                "velocity",
+                "vmax",
+                "amax",
+                "reaction_time",
+                "tti_sigma",
+                "lambda_att",
+                "lambda_def",
+            )
+        ):
+            changed.add(pid)
+    return sorted(changed)
+
+
+def _integrate_pitch_control(arrival_times, att, dfd, params):
+    # integrate equation 3 of Spearman 2018 at each target (see calculate_arrival_times for 'arrival_times'). Targets are
+    # dropped from the working arrays as soon as they converge or hit the integration time limit. Returns the team
+    # probabilities (targets,), the probabilities of each player (targets, players) and the number of integration
+    # steps taken and whether the integration converged at each target, as a dictionary ('n_steps', 'converged').
+    ball_travel_time = arrival_times["ball_travel_time"]
+    tti_att = arrival_times["tti_att"]
+    tti_def = arrival_times["tti_def"]
+    dtype = tti_att.dtype
+    PPCFatt = np.zeros(ball_travel_time.size, dtype=dtype)
+    PPCFdef = np.zeros(ball_travel_time.size, dtype=dtype)
+    PPCF_players_att = np.zeros_like(tti_att)
+    PPCF_players_def = np.zeros_like(tti_def)
+    stats = {
+        "n_steps": np.zeros(ball_travel_time.size, dtype=int),
+        "converged": np.zeros(ball_travel_time.size, dtype=bool),
+    }
+    # remove any player that is far (in time) from the target location by zeroing their ball control rate
+    lambda_att = np.where(
+        tti_att - arrival_times["tau_min_att"][:, None]
+        < params["time_to_control_att"],
+        att.lambda_att.astype(dtype),
+        0.0,
+    )
+    lambda_def = np.where(
+        tti_def - arrival_times["tau_min_def"][:, None]
+        < params["time_to_control_def"],
+        dfd.lambda_def.astype(dtype),
+        0.0,
+    )
+    integrator = params.get("integrator", "euler")
+    if integrator == "euler":
+        # integration time grid, T = ball_travel_time - int_dt + i * delta (as produced by np.arange in the scalar
+        # version)
+        dt = params["int_dt"]
+        T_start = ball_travel_time - dt
+        T_delta = (T_start + dt) - T_start
+        n_steps = np.ceil(
+            ((ball_travel_time + params["max_int_time"]) - T_start) / dt
+        ).astype(int)
+    elif integrator == "exponential":
+        # step i covers [ball_travel_time + (i-1)*dt, ball_travel_time + i*dt], and the rates are taken at its midpoint
+        dt = params["exp_int_dt"]
+        T_start = ball_travel_time - dt / 2.0
+        T_delta = np.full(ball_travel_time.size, dt, dtype=dtype)
+        n_steps = np.full(
+            ball_travel_time.size, int(np.ceil(params["max_int_time"] / dt)) + 1
+        )
+    else:
+        assert False, "integrator must be either 'euler' or 'exponential'"
+    # working arrays: the targets still being integrated, and the running ball control probability of each player.
+    # Finished targets are masked out ('active') and dropped from the arrays once they make up a quarter of them, rather
+    # than copying every array at each step where any target finishes. A masked target gets no further increments and
+    # its results are copied out at the step it finishes, so the results are the same as dropping it straight away.
+    work = {
+        "index": np.flatnonzero(n_steps > 1),
+        "active": np.ones(ball_travel_time.size, dtype=bool),
+        "T_start": T_start,
+        "T_delta": T_delta,
+        "n_steps": n_steps,
+        "tti_att": tti_att,
+        "tti_def": tti_def,
+        "lambda_att": lambda_att,
+        "lambda_def": lambda_def,
+        "PPCF_players_att": np.zeros_like(tti_att),
+        "PPCF_players_def": np.zeros_like(tti_def),
+        "PPCFatt": PPCFatt.copy(),
+        "PPCFdef": PPCFdef.copy(),
+    }
+    work.update({k: v[work["index"]] for k, v in work.items() if k != "index"})
+    # targets that hit the integration time limit before converging (reported once, at the end)
+    n_failed, lowest_ptot = 0, np.inf
+    i = 1
+    while work["index"].size:
+        T = (work["T_start"] + i * work["T_delta"])[:, None]
+        p_remaining = ((1 - work["PPCFatt"] - work["PPCFdef"]) * work["active"])[
+            :, None
+        ]
+        f_att = _probability_intercept_ball(T, work["tti_att"], att.tti_slope)
+        f_def = _probability_intercept_ball(T, work["tti_def"], dfd.tti_slope)
+        dPPCFdT_att = p_remaining * f_att * work["lambda_att"]
+        dPPCFdT_def = p_remaining * f_def * work["lambda_def"]
+        # make sure they're greater than zero
+        assert np.all(
+            dPPCFdT_att >= 0
+        ), "Invalid attacking player probability (calculate_pitch_control_surface)"
+        assert np.all(
+            dPPCFdT_def >= 0
+        ), "Invalid defending player probability (calculate_pitch_control_surface)"
+        if integrator == "exponential":
+            # with the rates held fixed over the step, the probability that nobody has controlled the ball decays
+            # exponentially, so the step is (1-exp(-rate*dt))/rate rather than dt
+            rate = np.sum(f_att * work["lambda_att"], axis=1) + np.sum(
+                f_def * work["lambda_def"], axis=1
+            )
+            step = np.where(
+                rate > 0, -np.expm1(-rate * dt) / np.where(rate > 0, rate, 1.0), dt
+            )[:, None]
+        else:
+            step = dt
+        work["PPCF_players_att"] += dPPCFdT_att * step
+        work["PPCF_players_def"] += dPPCFdT_def * step
+        work["PPCFatt"] = work["PPCF_players_att"].sum(axis=1)
+        work["PPCFdef"] = work["PPCF_players_def"].sum(axis=1)
+        i += 1
+        # targets stop integrating once they converge or hit the integration time limit
+        converged = (
+            1 - (work["PPCFatt"] + work["PPCFdef"]) <= params["model_converge_tol"]
+        )
+        done = work["active"] & (converged | (i >= work["n_steps"]))
+        if np.any(done):
+            failed = done & ~converged
+            if np.any(failed):
+                n_failed += np.count_nonzero(failed)
+                ptot = work["PPCFatt"][failed] + work["PPCFdef"][failed]
+                lowest_ptot = min(lowest_ptot, ptot.min())
+            PPCFatt[work["index"][done]] = work["PPCFatt"][done]
+            PPCFdef[work["index"][done]] = work["PPCFdef"][done]
+            PPCF_players_att[work["index"][done]] = work["PPCF_players_att"][done]
+            PPCF_players_def[work["index"][done]] = work["PPCF_players_def"][done]
+            stats["n_steps"][work["index"][done]] = i - 1
+            stats["converged"][work["index"][done]] = converged[done]
+            work["active"] &= ~done
+            if np.count_nonzero(work["active"]) <= 0.75 * work["active"].size:
+                work = {k: v[work["active"]] for k, v in work.items()}
+    if n_failed:
+        warnings.warn(
+            "Integration failed to converge at %d targets "
+            "(lowest total probability %1.3f)" % (n_failed, lowest_ptot),
+            RuntimeWarning,
+        )
+    return PPCFatt, PPCFdef, PPCF_players_att, PPCF_players_def, stats
+
+
+# approximate number of (targets x players) 'dtype' arrays alive at once while a tile is evaluated (arrival times,
+# integration work arrays and their temporaries)
+_TILE_ARRAYS_PER_PLAYER = 16
+
+
+def _tile_size(n_players, max_bytes, itemsize):
+    # number of targets that can be evaluated at once within max_bytes (at least one), for working arrays of
+    # itemsize bytes per element (4 for float32, 8 for float64)
+    if max_bytes is None:
+        return np.inf
+    bytes_per_target = _TILE_ARRAYS_PER_PLAYER * max(n_players, 1) * itemsize
+    return max(int(max_bytes // bytes_per_target), 1)
+
+
+def _max_displacement(positions):
+    # largest distance moved by any player (or the ball) from their position in the first frame: positions has dimen
+    # (frames, players, 2). A player that enters or leaves the pitch counts as an infinite displacement
+    missing = np.isnan(positions[:, :, 0])
+    if np.any(missing != missing[0]):
+        return np.inf
+    distance = np.sqrt(np.sum((positions - positions[0]) ** 2, axis=2))
+    return np.max(distance[~missing], initial=0.0)
+
+
+def _interpolation_error_estimates(surfaces, key_rows, teams):
+    # estimated error of linear interpolation over each segment between key frames, h^2/8 * max|f''|, with the second
+    # derivative found from the second divided differences of the surfaces at the key frames at either end. It is NaN
+    # where there are no neighbouring key frames with the same team in possession.
+    curvature = np.full(len(key_rows), np.nan)
+    for start in range(1, len(key_rows) - 1, 256):
+        j = np.arange(start, min(start + 256, len(key_rows) - 1))
+        h0 = (key_rows[j] - key_rows[j - 1])[:, None, None]
+        h1 = (key_rows[j + 1] - key_rows[j])[:, None, None]
+        previous, current, following = (
+            surfaces[key_rows[j - 1]],
+            surfaces[key_rows[j]],
+            surfaces[key_rows[j + 1]],
+        )
+        second_difference = (
+            2 * ((following - current) / h1 - (current - previous) / h0) / (h0 + h1)
+        )
+        same_team = (teams[key_rows[j - 1]] == teams[key_rows[j]]) & (
+            teams[key_rows[j]] == teams[key_rows[j + 1]]
+        )
+        curvature[j] = np.where(
+            same_team, np.abs(second_difference).reshape(len(j), -1).max(axis=1), np.nan
+        )
+    return np.diff(key_rows) ** 2 / 8.0 * np.fmax(curvature[:-1], curvature[1:])
+
+
+def _tti_slope(params):
+    # sigmoid slope: precomputed by ModelParams, always derived from 'tti_sigma' for dictionaries (which may have been changed)
+    if isinstance(params, ModelParams):
+        return params.tti_slope
+    return np.pi / np.sqrt(3.0) / params["tti_sigma"]
+
+
+def _dtype(params):
+    # floating point type of the vectorized engine (float64 unless params['dtype'] says otherwise)
+    return np.dtype(params.get("dtype", "float64"))
+
+
+def _ball_travel_time(target_positions, ball_start_pos, params):
+    # ball travel time is distance to target position from current ball position divided assumed average ball speed
+    dtype = _dtype(params)
+    target_positions = np.asarray(target_positions, dtype=dtype).reshape(-1, 2)
+    if ball_start_pos is None:
+        return np.zeros(target_positions.shape[0], dtype=dtype)
+    # one ball start position for all targets, or one per target
+    ball_start_pos = np.asarray(ball_start_pos, dtype=dtype)
+    ball_travel_time = np.sqrt(
+        np.sum((target_positions - ball_start_pos) ** 2, axis=1)
+    ) / dtype.type(params["average_ball_speed"])
+    # if the ball start position is NaN, assume that ball is already at location
+    ball_travel_time[np.isnan(ball_travel_time)] = 0.0
+    return ball_travel_time
+
+
+def _as_team_state(players):
+    # TeamState for a list of 'player' objects (TeamState objects are passed through)
+    if isinstance(players, TeamState):
+        return players
+    return TeamState.from_players(players)
+
+
+def _onside_mask(att, dfd, ball_position, tol=0.2):
+    # array version of check_offsides(): True for attacking players that are not offside
+    assert np.any(
+        dfd.is_gk
+    ), "Defending goalkeeper jersey number not found in defending players"
+    defending_half = np.sign(dfd.position[dfd.is_gk, 0][0])
+    second_deepest_defender_x = np.sort(defending_half * dfd.position[:, 0])[-2]
+    offside_line = (
+        max(second_deepest_defender_x, defending_half * ball_position[0], 0.0) + tol
+    )
+    return att.position[:, 0] * defending_half <= offside_line
+
+
+def _time_to_intercept(target_positions, team, tti_model="simple"):
+    # vectorized player.simple_time_to_intercept() (or player.accelerated_time_to_intercept() if tti_model is
+    # "acceleration"): dimen (targets, players), in the dtype of target_positions
+    assert tti_model in (
+        "simple",
+        "acceleration",
+    ), "tti_model must be either 'simple' or 'acceleration'"
+    dtype = target_positions.dtype
+    r_reaction = (team.position + team.velocity * team.reaction_time[:, None]).astype(
+        dtype
+    )
+    dx = target_positions[:, None, 0] - r_reaction[None, :, 0]
+    dy = target_positions[:, None, 1] - r_reaction[None, :, 1]
+    distance = np.sqrt(dx ** 2 + dy ** 2)
+    reaction_time = team.reaction_time.astype(dtype)
+    vmax = team.vmax.astype(dtype)
+    if tti_model == "simple":
+        return reaction_time + distance / vmax
+    # speed towards the target at the end of the reaction time (no more than vmax)
+    velocity = team.velocity.astype(dtype)
+    u = dx * velocity[:, 0] + dy * velocity[:, 1]
+    np.divide(u, distance, out=u, where=distance > 0)
+    np.minimum(u, vmax, out=u)
+    u[distance == 0] = 0.0
+    amax = team.amax.astype(dtype)
+    # time to intercept once vmax is reached: equivalent to accelerating from u to vmax and then running at vmax
+    tti = reaction_time + distance / vmax + (vmax - u) ** 2 / (2 * amax * vmax)
+    # targets reached before vmax is reached (only those very close to the player)
+    close = np.nonzero(2 * amax * distance < vmax ** 2 - u ** 2)
+    if close[0].size:
+        u, distance = u[close], distance[close]
+        amax = np.broadcast_to(amax, tti.shape)[close]
+        tti[close] = reaction_time[close[1]] + (
+            np.sqrt(u ** 2 + 2 * amax * distance) - u
+        ) / amax
+    return tti
+
+
+def _probability_intercept_ball(T, time_to_intercept, tti_slope):
+    # vectorized player.probability_intercept_ball(), in the dtype of time_to_intercept
+    slope = (-tti_slope).astype(time_to_intercept.dtype)
+    return 1 / (1.0 + np.exp(slope * (T - time_to_intercept)))
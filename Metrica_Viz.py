@@ -476,9 +476,9 @@ def plot_pitchcontrol_for_event(
     events,
     tracking_home,
     tracking_away,
-    PPCF,
-    xgrid,
-    ygrid,
+    PPCF=None,
+    xgrid=None,
+    ygrid=None,
     alpha=0.7,
     include_player_velocities=True,
     annotate=False,
@@ -496,6 +496,7 @@ def plot_pitchcontrol_for_event(
     alpha_pitch_control=0.5,
     team_colors=("r", "b"),
     field_color="white",
+    archive=None,
 ):
     """ plot_pitchcontrol_for_event( event_id, events,  tracking_home, tracking_away, PPCF, xgrid, ygrid )
 
@@ -519,6 +520,8 @@ def plot_pitchcontrol_for_event(
         alpha_pitch_control: alpha (transparency) of spaces heatmap. Default is 0.5
         team_colors: Tuple containing the team colors of the home & away team. Default is 'r' (red, home team) and 'b' (blue away team)
         field_color: color of the field. Default is green.
+        archive: Metrica_Archive.PitchControlArchive of event surfaces (written with write_pitch_control_archive_for_events)
+                 to read the pitch control surface of the event from, if PPCF, xgrid and ygrid are not given. Default is None.
 
     Returrns
     -----------
@@ -526,6 +529,18 @@ def plot_pitchcontrol_for_event(
 
     """
 
+    # read the pitch control surface from the archive if it has not been passed in
+    if PPCF is None:
+        assert (
+            archive is not None
+        ), "Either PPCF, xgrid & ygrid or an archive must be given"
+        assert (
+            archive.event_ids is not None
+        ), "The archive holds frame surfaces, event surfaces are needed"
+        surface = archive.get_event_surface(event_id, events)
+        assert surface is not None, "Event %s is not in the archive" % event_id
+        PPCF, xgrid, ygrid = surface
+
     # pick a pass at which to generate the pitch control surface
     event_frame = events.loc[event_id]["Start Frame"]
 
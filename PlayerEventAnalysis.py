@@ -22,6 +22,8 @@ class PlayerEventAnalysis(object):
         epv=False,
         field_dimens=(106.0, 68.0),
         n_grid_cells_x=50,
+        cache=None,
+        archive=None,
     ):
         """
         This class is used to consolidate many of the functions that would be used to analyze the impact of an
@@ -85,6 +87,16 @@ class PlayerEventAnalysis(object):
         :param tuple field_dimens: tuple containing the length and width of the pitch in meters. Default is (106,68)
         :param int n_grid_cells_x: Number of pixels in the grid (in the x-direction) that covers the surface.
                 Default is 50. n_grid_cells_y will be calculated based on n_grid_cells_x and the field dimensions
+        :param Metrica_Cache.PitchControlCache cache: Optional cache for the pitch control surfaces of the event (the
+                baseline surface and the edited surfaces). Share one cache between analyses of the same event (and
+                with ``Metrica_PitchControl.generate_pitch_control_for_event`` or
+                ``Metrica_EPV.find_max_value_added_target``) so that each surface is only computed once. Defaults to
+                None (no caching).
+        :param Metrica_Archive.PitchControlArchive archive: Optional archive of precomputed event surfaces (written
+                with ``write_pitch_control_archive_for_events``). If the event is in the archive (generated with the
+                same params and grid), the pitch control surface of the event is read from it rather than recomputed.
+                Frame archives are not used, as their surfaces have the ball at its tracking position rather than the
+                start position of the event. Defaults to None.
         """
 
         self.tracking_home = tracking_home
@@ -98,20 +110,70 @@ class PlayerEventAnalysis(object):
         self.epv = epv
         self.field_dimens = field_dimens
         self.n_grid_cells_x = n_grid_cells_x
+        self.cache = cache
         self.tracking_frame = self.events.loc[self.event_id]["Start Frame"]
         self.team_in_possession_pitch_control = self.events.loc[self.event_id]["Team"]
-        (
-            self.event_pitch_control,
-            self.xgrid,
-            self.ygrid,
-        ) = mpc.generate_pitch_control_for_event(
-            event_id=self.event_id,
-            events=self.events,
-            tracking_home=self.tracking_home,
-            tracking_away=self.tracking_away,
-            params=self.params,
-            GK_numbers=self.gk_numbers,
+        self.ball_start_pos = np.array(
+            [
+                self.events.loc[self.event_id]["Start X"],
+                self.events.loc[self.event_id]["Start Y"],
+            ]
+        )
+        # The grid and the ball travel times to its cells are shared by every surface we compute for the event
+        self.pitch_grid = mpc.get_pitch_grid(
+            field_dimen=self.field_dimens, n_grid_cells_x=self.n_grid_cells_x
+        )
+        self.xgrid, self.ygrid = self.pitch_grid.xgrid, self.pitch_grid.ygrid
+        self.target_positions = self.pitch_grid.target_positions
+        self.ball_travel_time = self.pitch_grid.ball_travel_time(
+            self.ball_start_pos, self.params
+        )
+        # We keep the player states, arrival times and pitch control probabilities for both teams during the event, so
+        # that the edited surfaces below only recompute the cells affected by the player we change
+        self.attacking_players, self.defending_players = self._get_team_states(
+            self.tracking_home.loc[self.tracking_frame],
+            self.tracking_away.loc[self.tracking_frame],
+        )
+        self.player_names = [
+            team.teamname + "_" + str(player_id)
+            for team in (self.attacking_players, self.defending_players)
+            for player_id in team.player_ids
+        ]
+        # The surface of the event is cached under the same key as generate_pitch_control_for_event uses, so that it
+        # is only computed once however many analyses of the event share the cache
+        baseline = self._get_cached_event_pitch_control()
+        if baseline is None and archive is not None:
+            baseline = self._get_archived_pitch_control(archive)
+        if baseline is None:
+            baseline = mpc.calculate_pitch_control_surface(
+                self.target_positions,
+                self.attacking_players,
+                self.defending_players,
+                self.ball_start_pos,
+                self.params,
+                return_player_contributions=True,
+                ball_travel_time=self.ball_travel_time,
+            )
+            checksum = np.mean(baseline[0] + baseline[1])
+            assert (
+                1 - checksum < self.params["model_converge_tol"]
+            ), "Checksum failed: %1.3f" % (1 - checksum)
+            self._put_cached_event_pitch_control(baseline)
+        self.PPCFatt, self.PPCFdef, player_pitch_control = baseline
+        self.arrival_times = mpc.calculate_arrival_times(
+            self.target_positions,
+            self.attacking_players,
+            self.defending_players,
+            self.ball_start_pos,
+            self.params,
+            ball_travel_time=self.ball_travel_time,
         )
+        self.event_pitch_control = self.PPCFatt.reshape(
+            len(self.ygrid), len(self.xgrid)
+        )
+        # The same evaluation also gives us the pitch control surface of each individual player during the event
+        # (unless the surface was read from an archive, in which case they are computed when first needed)
+        self._player_pitch_control = player_pitch_control
         # If we are exploring EPV, we will also initialize the EPV grid provided by @EightyFivePoint and compute
         # the controlled EPV surface during the event from the perspective of the attacking team
         if self.epv:
@@ -121,6 +183,25 @@ class PlayerEventAnalysis(object):
             )
             self.team_in_possession_eepv_grid = self.event_pitch_control * self.EPV_grid
 
+    @property
+    def player_pitch_control(self):
+        """
+        The pitch control surface of each individual player during the event (dimen (players, n_grid_cells_y,
+        n_grid_cells_x) ), in the order of ``player_names``. The surfaces of the players of each team sum to that
+        team's surface.
+        """
+        if self._player_pitch_control is None:
+            _, _, self._player_pitch_control = mpc.calculate_pitch_control_surface(
+                self.target_positions,
+                self.attacking_players,
+                self.defending_players,
+                self.ball_start_pos,
+                self.params,
+                return_player_contributions=True,
+                ball_travel_time=self.ball_travel_time,
+            )
+        return self._player_pitch_control.reshape(-1, len(self.ygrid), len(self.xgrid))
+
     def calculate_total_space_on_pitch_team(
         self, pitch_control_result, calculating_diff=False
     ):
@@ -193,6 +274,38 @@ class PlayerEventAnalysis(object):
         else:
             return -1 * total_epv_proportion
 
+    def calculate_space_occupied_by_players(self):
+        """
+        Function Description:
+        This function calculates the space occupied by every player on the pitch during the event, using the
+        contribution of each player to his/her team's pitch control surface. All players come from the single pitch
+        control evaluation made when the class is initialized, so there is no need to remove each player from the pitch
+        in turn with ``calculate_pitch_control_without_player``. Note that this measures the space each player
+        controls, which is not the same as the space his/her team would lose if the player were removed.
+
+        Returns:
+        :return: A dictionary with keys of the form "Home_5" (team and player ID), and values of the number of square
+            meters of the pitch occupied by each player. If epv=True, values are the proportion of the EPV grid
+            controlled by each player instead.
+        """
+        space_occupied = {}
+        for player_name, player_pitch_control in zip(
+            self.player_names, self.player_pitch_control
+        ):
+            if self.epv:
+                space_occupied[player_name] = self.calculate_team_expected_epv(
+                    input_surface=player_pitch_control,
+                    input_surface_type="pitch_control",
+                    calculating_diff=True,
+                )
+            else:
+                space_occupied[
+                    player_name
+                ] = self.calculate_total_space_on_pitch_team(
+                    pitch_control_result=player_pitch_control, calculating_diff=True
+                )
+        return space_occupied
+
     def calculate_pitch_control_replaced_velocity(
         self, replace_x_velocity=0, replace_y_velocity=0,
     ):
@@ -221,34 +334,27 @@ class PlayerEventAnalysis(object):
         self._validate_inputs()
 
         # Replace player's velocity datapoints with new velocity vector
-        temp_tracking_home = self.tracking_home.copy()
-        temp_tracking_away = self.tracking_away.copy()
+        temp_home_row = self.tracking_home.loc[self.tracking_frame].copy()
+        temp_away_row = self.tracking_away.loc[self.tracking_frame].copy()
 
         if self.team_player_to_analyze == "Home":
-            temp_tracking_home.at[
-                self.tracking_frame, "Home_" + str(self.player_to_analyze) + "_vx"
+            temp_home_row[
+                "Home_" + str(self.player_to_analyze) + "_vx"
             ] = replace_x_velocity
-            temp_tracking_home.at[
-                self.tracking_frame, "Home_" + str(self.player_to_analyze) + "_vy"
+            temp_home_row[
+                "Home_" + str(self.player_to_analyze) + "_vy"
             ] = replace_y_velocity
         elif self.team_player_to_analyze == "Away":
-            temp_tracking_away.at[
-                self.tracking_frame, "Away_" + str(self.player_to_analyze) + "_vx"
+            temp_away_row[
+                "Away_" + str(self.player_to_analyze) + "_vx"
             ] = replace_x_velocity
-            temp_tracking_away.at[
-                self.tracking_frame, "Away_" + str(self.player_to_analyze) + "_vy"
+            temp_away_row[
+                "Away_" + str(self.player_to_analyze) + "_vy"
             ] = replace_y_velocity
 
         # Generate a new pitch control, with the one player's attributes edited
-        edited_pitch_control, xgrid, ygrid = mpc.generate_pitch_control_for_event(
-            event_id=self.event_id,
-            events=self.events,
-            tracking_home=temp_tracking_home,
-            tracking_away=temp_tracking_away,
-            params=self.params,
-            GK_numbers=self.gk_numbers,
-            field_dimen=self.field_dimens,
-            n_grid_cells_x=self.n_grid_cells_x,
+        edited_pitch_control, xgrid, ygrid = self._calculate_edited_pitch_control(
+            temp_home_row, temp_away_row
         )
         if self.epv:
             return edited_pitch_control * self.EPV_grid, xgrid, ygrid
@@ -273,46 +379,39 @@ class PlayerEventAnalysis(object):
 
         # Replace player's datapoint nan's, so pitch control does not take into account
         # the player when computing its surface
-        temp_tracking_home = self.tracking_home.copy()
-        temp_tracking_away = self.tracking_away.copy()
+        temp_home_row = self.tracking_home.loc[self.tracking_frame].copy()
+        temp_away_row = self.tracking_away.loc[self.tracking_frame].copy()
 
         if self.team_player_to_analyze == "Home":
-            temp_tracking_home.at[
-                self.tracking_frame, "Home_" + str(self.player_to_analyze) + "_x"
+            temp_home_row[
+                "Home_" + str(self.player_to_analyze) + "_x"
             ] = np.nan
-            temp_tracking_home.at[
-                self.tracking_frame, "Home_" + str(self.player_to_analyze) + "_y"
+            temp_home_row[
+                "Home_" + str(self.player_to_analyze) + "_y"
             ] = np.nan
-            temp_tracking_home.at[
-                self.tracking_frame, "Home_" + str(self.player_to_analyze) + "_vx"
+            temp_home_row[
+                "Home_" + str(self.player_to_analyze) + "_vx"
             ] = np.nan
-            temp_tracking_home.at[
-                self.tracking_frame, "Home_" + str(self.player_to_analyze) + "_vy"
+            temp_home_row[
+                "Home_" + str(self.player_to_analyze) + "_vy"
             ] = np.nan
         elif self.team_player_to_analyze == "Away":
-            temp_tracking_away.at[
-                self.tracking_frame, "Away_" + str(self.player_to_analyze) + "_x"
+            temp_away_row[
+                "Away_" + str(self.player_to_analyze) + "_x"
             ] = np.nan
-            temp_tracking_away.at[
-                self.tracking_frame, "Away_" + str(self.player_to_analyze) + "_y"
+            temp_away_row[
+                "Away_" + str(self.player_to_analyze) + "_y"
             ] = np.nan
-            temp_tracking_away.at[
-                self.tracking_frame, "Away_" + str(self.player_to_analyze) + "_vx"
+            temp_away_row[
+                "Away_" + str(self.player_to_analyze) + "_vx"
             ] = np.nan
-            temp_tracking_away.at[
-                self.tracking_frame, "Away_" + str(self.player_to_analyze) + "_vy"
+            temp_away_row[
+                "Away_" + str(self.player_to_analyze) + "_vy"
             ] = np.nan
 
         # Generate a new pitch control, with the one player's attributes edited
-        edited_pitch_control, xgrid, ygrid = mpc.generate_pitch_control_for_event(
-            event_id=self.event_id,
-            events=self.events,
-            tracking_home=temp_tracking_home,
-            tracking_away=temp_tracking_away,
-            params=self.params,
-            field_dimen=self.field_dimens,
-            GK_numbers=self.gk_numbers,
-            n_grid_cells_x=self.n_grid_cells_x,
+        edited_pitch_control, xgrid, ygrid = self._calculate_edited_pitch_control(
+            temp_home_row, temp_away_row
         )
         if self.epv:
             return edited_pitch_control * self.EPV_grid, xgrid, ygrid
@@ -367,48 +466,41 @@ class PlayerEventAnalysis(object):
             )
 
         # Replace datapoints with a new location and velocity vector
-        temp_tracking_home = self.tracking_home.copy()
-        temp_tracking_away = self.tracking_away.copy()
+        temp_home_row = self.tracking_home.loc[self.tracking_frame].copy()
+        temp_away_row = self.tracking_away.loc[self.tracking_frame].copy()
 
         if self.team_player_to_analyze == "Home":
-            temp_tracking_home.at[
-                self.tracking_frame, "Home_" + str(self.player_to_analyze) + "_x"
+            temp_home_row[
+                "Home_" + str(self.player_to_analyze) + "_x"
             ] += relative_x_change
-            temp_tracking_home.at[
-                self.tracking_frame, "Home_" + str(self.player_to_analyze) + "_y"
+            temp_home_row[
+                "Home_" + str(self.player_to_analyze) + "_y"
             ] += relative_y_change
             if replace_velocity:
-                temp_tracking_home.at[
-                    self.tracking_frame, "Home_" + str(self.player_to_analyze) + "_vx"
+                temp_home_row[
+                    "Home_" + str(self.player_to_analyze) + "_vx"
                 ] = replace_x_velocity
-                temp_tracking_home.at[
-                    self.tracking_frame, "Home_" + str(self.player_to_analyze) + "_vy"
+                temp_home_row[
+                    "Home_" + str(self.player_to_analyze) + "_vy"
                 ] = replace_y_velocity
         elif self.team_player_to_analyze == "Away":
-            temp_tracking_away.at[
-                self.tracking_frame, "Away_" + str(self.player_to_analyze) + "_x"
+            temp_away_row[
+                "Away_" + str(self.player_to_analyze) + "_x"
             ] += relative_x_change
-            temp_tracking_away.at[
-                self.tracking_frame, "Away_" + str(self.player_to_analyze) + "_y"
+            temp_away_row[
+                "Away_" + str(self.player_to_analyze) + "_y"
             ] += relative_y_change
             if replace_velocity:
-                temp_tracking_away.at[
-                    self.tracking_frame, "Away_" + str(self.player_to_analyze) + "_vx"
+                temp_away_row[
+                    "Away_" + str(self.player_to_analyze) + "_vx"
                 ] = replace_x_velocity
-                temp_tracking_away.at[
-                    self.tracking_frame, "Away_" + str(self.player_to_analyze) + "_vy"
+                temp_away_row[
+                    "Away_" + str(self.player_to_analyze) + "_vy"
                 ] = replace_y_velocity
 
         # Generate a new pitch control, with the one player's attributes edited
-        edited_pitch_control, xgrid, ygrid = mpc.generate_pitch_control_for_event(
-            event_id=self.event_id,
-            events=self.events,
-            tracking_home=temp_tracking_home,
-            tracking_away=temp_tracking_away,
-            params=self.params,
-            field_dimen=self.field_dimens,
-            GK_numbers=self.gk_numbers,
-            n_grid_cells_x=self.n_grid_cells_x,
+        edited_pitch_control, xgrid, ygrid = self._calculate_edited_pitch_control(
+            temp_home_row, temp_away_row
         )
         if self.epv:
             return edited_pitch_control * self.EPV_grid, xgrid, ygrid
@@ -1063,6 +1155,231 @@ class PlayerEventAnalysis(object):
             )
         plt.show()
 
+    def _get_team_states(self, tracking_home_row, tracking_away_row):
+        """
+        Function Description:
+            This function builds the attacking and defending team states used by the pitch control model from a row of
+            each tracking DataFrame, removing any attacking players that are offside.
+        Input Parameters:
+        :param pd.Series tracking_home_row: The row of the Home team tracking DataFrame at the frame of the event
+        :param pd.Series tracking_away_row: The row of the Away team tracking DataFrame at the frame of the event
+        Returns:
+        :return: A tuple of ``Metrica_PitchControl.TeamState`` objects for the (attacking team, defending team)
+        """
+        home_players = mpc.initialise_team_state(
+            tracking_home_row, "Home", self.params, self.gk_numbers[0]
+        )
+        away_players = mpc.initialise_team_state(
+            tracking_away_row, "Away", self.params, self.gk_numbers[1]
+        )
+        if self.team_in_possession_pitch_control == "Home":
+            attacking_players, defending_players = home_players, away_players
+        else:
+            attacking_players, defending_players = away_players, home_players
+        attacking_players = mpc.check_offsides(
+            attacking_players, defending_players, self.ball_start_pos, self.gk_numbers
+        )
+        return attacking_players, defending_players
+
+    def _calculate_edited_pitch_control(self, tracking_home_row, tracking_away_row):
+        """
+        Function Description:
+            This function calculates the pitch control surface of the event after one player's attributes have been
+            edited in the tracking rows. Rather than computing the surface from scratch, the surface of the event is
+            updated only in the cells where the edited player affects the pitch control model.
+        Input Parameters:
+        :param pd.Series tracking_home_row: The (edited) row of the Home team tracking DataFrame at the frame of the
+            event
+        :param pd.Series tracking_away_row: The (edited) row of the Away team tracking DataFrame at the frame of the
+            event
+        Returns:
+        edited_pitch_control: Pitch control surface (dimen (n_grid_cells_x,n_grid_cells_y) ) containing pitch control
+                probability for the attacking team after editing the player
+        xgrid: Positions of the pixels in the x-direction (field length)
+        ygrid: Positions of the pixels in the y-direction (field width)
+        """
+        attacking_players, defending_players = self._get_team_states(
+            tracking_home_row, tracking_away_row
+        )
+        edited = self._get_cached_pitch_control(
+            "edited", attacking_players, defending_players
+        )
+        if edited is None:
+            PPCFatt, PPCFdef, _ = mpc.update_pitch_control_surface(
+                self.target_positions,
+                self.PPCFatt,
+                self.PPCFdef,
+                self.arrival_times,
+                self.attacking_players,
+                self.defending_players,
+                attacking_players,
+                defending_players,
+                self.ball_start_pos,
+                self.params,
+            )
+            # check probabilitiy sums within convergence
+            checksum = np.mean(PPCFatt + PPCFdef)
+            assert (
+                1 - checksum < self.params["model_converge_tol"]
+            ), "Checksum failed: %1.3f" % (1 - checksum)
+            edited = (PPCFatt, PPCFdef)
+            self._put_cached_pitch_control(
+                "edited", edited, attacking_players, defending_players
+            )
+        PPCFatt, PPCFdef = edited
+        edited_pitch_control = PPCFatt.reshape(len(self.ygrid), len(self.xgrid))
+        return edited_pitch_control, self.xgrid, self.ygrid
+
+    def _get_archived_pitch_control(self, archive):
+        """
+        Function Description:
+            This function reads the pitch control surface of the event from an archive of precomputed surfaces. The
+            defending team's surface is taken as 1 minus the attacking team's surface.
+        Input Parameters:
+        :param Metrica_Archive.PitchControlArchive archive: The archive of precomputed surfaces
+        Returns:
+        :return: A tuple of (attacking team probabilities, defending team probabilities, None) in the form used for
+            the baseline surface, or None if the event is not in the archive, the archive is not an event archive or
+            the archive was generated with different params or grid
+        """
+        if not archive.matches(self.params, self.field_dimens, self.n_grid_cells_x):
+            return None
+        surface = archive.get_event_surface(self.event_id, self.events)
+        if surface is None:
+            return None
+        PPCFatt = np.array(surface[0], dtype=float).ravel()
+        return PPCFatt, 1 - PPCFatt, None
+
+    def _event_cache_key(self):
+        """
+        Function Description:
+            This function builds the cache key of the pitch control surface of the event. It is the key used by
+            ``Metrica_PitchControl.generate_pitch_control_for_event`` (with offsides removed, as in this analysis), so
+            the surface is shared with any other function that evaluates the event through the same cache (e.g.
+            ``Metrica_EPV.find_max_value_added_target``).
+        Returns:
+        :return: The cache key (a hex string)
+        """
+        return mpc.event_cache_key(
+            self.cache,
+            self.event_id,
+            self.events,
+            self.tracking_home,
+            self.tracking_away,
+            self.params,
+            self.gk_numbers,
+            field_dimen=self.field_dimens,
+            n_grid_cells_x=self.n_grid_cells_x,
+            offsides=True,
+        )
+
+    def _get_cached_event_pitch_control(self):
+        """
+        Function Description:
+            This function looks up the pitch control surface of the event in the cache (if there is one).
+        Returns:
+        :return: A tuple of (attacking team probabilities, defending team probabilities, player probabilities) in the
+            form used for the baseline surface, or None if there is no cache or the surface of each player has not been
+            computed yet
+        """
+        if self.cache is None:
+            return None
+        entry = self.cache.get(self._event_cache_key())
+        # an entry without the player surfaces is replaced by _put_cached_event_pitch_control once they are computed
+        if entry is None or "PPCF_players" not in entry:
+            return None
+        PPCF_players = entry["PPCF_players"]
+        return (
+            entry["PPCFa"].ravel(),
+            entry["PPCFd"].ravel(),
+            PPCF_players.reshape(len(PPCF_players), -1),
+        )
+
+    def _put_cached_event_pitch_control(self, baseline):
+        """
+        Function Description:
+            This function stores the pitch control surface of the event in the cache (if there is one), in the form
+            stored by ``Metrica_PitchControl.generate_pitch_control_for_event``.
+        Input Parameters:
+        :param tuple baseline: The (attacking team probabilities, defending team probabilities, player probabilities)
+        """
+        if self.cache is not None:
+            shape = (len(self.ygrid), len(self.xgrid))
+            PPCFatt, PPCFdef, player_pitch_control = baseline
+            entry = {
+                "PPCFa": PPCFatt.reshape(shape),
+                "PPCFd": PPCFdef.reshape(shape),
+                "PPCF_players": player_pitch_control.reshape((-1,) + shape),
+                "player_names": self.player_names,
+            }
+            self.cache.put(self._event_cache_key(), entry)
+
+    def _pitch_control_cache_key(
+        self, surface, attacking_players=None, defending_players=None
+    ):
+        """
+        Function Description:
+            This function builds the cache key of a pitch control surface of the event, from everything the surface
+            depends on (frame, team in possession, ball position, player states, model parameters and grid).
+        Input Parameters:
+        :param str surface: The type of surface, "edited" (the surface of the event itself is cached under
+            ``_event_cache_key``)
+        :param Metrica_PitchControl.TeamState attacking_players: The attacking team state (offside players removed).
+            Defaults to the unedited attacking team state of the event.
+        :param Metrica_PitchControl.TeamState defending_players: The defending team state. Defaults to the unedited
+            defending team state of the event.
+        Returns:
+        :return: The cache key (a hex string)
+        """
+        if attacking_players is None:
+            attacking_players = self.attacking_players
+        if defending_players is None:
+            defending_players = self.defending_players
+        return self.cache.make_key(
+            "PlayerEventAnalysis",
+            surface,
+            self.tracking_frame,
+            self.team_in_possession_pitch_control,
+            self.ball_start_pos,
+            attacking_players,
+            defending_players,
+            self.params,
+            self.field_dimens,
+            self.n_grid_cells_x,
+        )
+
+    def _get_cached_pitch_control(
+        self, surface, attacking_players=None, defending_players=None
+    ):
+        """
+        Function Description:
+            This function looks up a pitch control surface of the event in the cache (if there is one). See
+            ``_pitch_control_cache_key`` for the parameters.
+        Returns:
+        :return: The cached result, or None if there is no cache or the surface has not been computed yet
+        """
+        if self.cache is None:
+            return None
+        return self.cache.get(
+            self._pitch_control_cache_key(surface, attacking_players, defending_players)
+        )
+
+    def _put_cached_pitch_control(
+        self, surface, result, attacking_players=None, defending_players=None
+    ):
+        """
+        Function Description:
+            This function stores a pitch control surface of the event in the cache (if there is one). See
+            ``_pitch_control_cache_key`` for the parameters.
+        """
+        if self.cache is not None:
+            self.cache.put(
+                self._pitch_control_cache_key(
+                    surface, attacking_players, defending_players
+                ),
+                result,
+            )
+
     def _determine_offside_position(self):
         """
         Function Description:
@@ -5,8 +5,13 @@ areas more)
 """
 
 import data_setup as data
+from Metrica_Cache import PitchControlCache
 from PlayerEventAnalysis import PlayerEventAnalysis
 
+# Both analyses below start from the same pitch control surface for event 820, so they share a cache and it is only
+# computed once
+cache = PitchControlCache()
+
 common_kw_args = {
     "tracking_home": data.tracking_home,
     "tracking_away": data.tracking_away,
@@ -16,6 +21,7 @@ common_kw_args = {
     "gk_numbers": data.GK_numbers,
     "field_dimens": (106.0, 68.0),
     "n_grid_cells_x": 50,
+    "cache": cache,
 }
 
 example_player_analysis_pitch_control = PlayerEventAnalysis(